@@ -0,0 +1 @@
+"""ゲームコントローラーのベンチマーク (リポジトリのルートから python3 -m benchmarks.<名前> で実行する)"""
@@ -0,0 +1,53 @@
+"""ワイヤーフォーマットのエンコード/デコード時間とデータグラムサイズを比べる
+
+    python3 -m benchmarks.bench_codec
+"""
+import argparse
+import json
+import timeit
+from codec import CODECS, FIXED_COMMANDS
+
+
+SAMPLES = {
+    "emergency_stop": FIXED_COMMANDS["emergency_stop"],
+    "start_game": FIXED_COMMANDS["start_game"],
+    "place_ball": {"type": "game_command", "command": "place_ball",
+                   "x": 1.25, "y": -0.75, "team_color": "yellow"},
+}
+
+
+def legacy_encode(data):
+    """以前の送信経路 (毎回 dict を作り直して json.dumps + encode)"""
+    return json.dumps(dict(data)).encode('utf-8')
+
+
+def bench(func, number):
+    """1回あたりの実行時間 [us] (5回計測した最小値)"""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--number", type=int, default=100000,
+                        help="1回の計測での繰り返し回数")
+    args = parser.parse_args()
+
+    print(f"{'command':<16}{'format':<14}{'encode [us]':>12}"
+          f"{'decode [us]':>12}{'size [B]':>10}")
+    for command, data in SAMPLES.items():
+        legacy = legacy_encode(data)
+        rows = [("json (legacy)", lambda: legacy_encode(data),
+                 lambda: json.loads(legacy.decode('utf-8')), len(legacy))]
+        for name, codec in CODECS.items():
+            encoded = codec.encode(data)
+            assert codec.decode(encoded) == data
+            rows.append((name, lambda codec=codec: codec.encode(data),
+                         lambda codec=codec, encoded=encoded: codec.decode(encoded),
+                         len(encoded)))
+        for name, encode, decode, size in rows:
+            print(f"{command:<16}{name:<14}{bench(encode, args.number):>12.3f}"
+                  f"{bench(decode, args.number):>12.3f}{size:>10}")
+
+
+if __name__ == "__main__":
+    main()
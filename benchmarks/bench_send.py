@@ -0,0 +1,216 @@
+"""送信経路のスループットとテールレイテンシを計測する (ディスプレイ不要)
+
+GameController の送信メソッドでコマンドを送り、ローカルの UDP シンクで受信数を数える。
+区間ごとの所要時間は送信経路の計測 (instrumentation.py) から取る。
+--save で結果を保存し、--compare で以前の結果と比べて悪化していれば終了コード 1 を返す。
+
+    python3 -m benchmarks.bench_send
+    python3 -m benchmarks.bench_send --save bench_baseline.json
+    python3 -m benchmarks.bench_send --compare bench_baseline.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import socket
+import statistics
+import threading
+import time
+import config
+from controller import GameController
+from targets import TargetRegistry
+
+
+class UdpSink:
+    """受信したデータグラムを数えるだけのローカルの受信側"""
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(0.2)
+        self.received = 0
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def addr(self):
+        return self.sock.getsockname()
+
+    def close(self):
+        self._running = False
+        self._thread.join(timeout=1.0)
+        self.sock.close()
+
+    def _run(self):
+        while self._running:
+            try:
+                self.sock.recvfrom(2048)
+            except socket.timeout:
+                continue
+            self.received += 1
+
+
+def run_scenario(name, wire_format, count, rate, targets):
+    """1つの条件で count 件のコマンドを送り、結果の dict を返す"""
+    sinks = [UdpSink() for _ in range(targets)]
+    registry = TargetRegistry()
+    for i, sink in enumerate(sinks):
+        registry.add(f"sink{i}", *sink.addr)
+
+    # 各コマンドの最終結果 (上書きされた place_ball の "superseded" を含む) を数える
+    done = threading.Event()
+    lock = threading.Lock()
+    outcomes = {}
+    last_done = [0.0]
+
+    def on_done(event, info):
+        with lock:
+            outcomes[event] = outcomes.get(event, 0) + 1
+            last_done[0] = time.perf_counter()
+            if sum(outcomes.values()) >= count:
+                done.set()
+
+    controller = GameController(registry, wire_format=wire_format, state_rate_hz=0)
+    # 送信メソッドと同じ GameController.send() の経路で送る。
+    # place_ball は毎回別の位置・交互のチームにする
+    commands = [GameController.build_command(name)
+                for name in ("emergency_stop", "start_game", "stop_game")]
+    commands += [GameController.build_command(
+        "place_ball", ("yellow", "blue")[i % 2], i * 0.001, 0.0) for i in range(2)]
+    interval = 1.0 / rate if rate > 0 else 0.0
+    start = time.perf_counter()
+    for i in range(count):
+        # GUI のボタン操作と同じく、send() の呼び出し前の時刻から callback 区間を測る
+        controller.send(commands[i % len(commands)], on_done, time.perf_counter())
+        if interval:
+            # busy-wait だと GIL を握り続けて送信スレッドを止めてしまうので sleep で待つ
+            time.sleep(max(start + (i + 1) * interval - time.perf_counter(), 0))
+    submitted = time.perf_counter() - start
+    done.wait(timeout=10.0)
+    elapsed = last_done[0] - start
+    controller.close()
+    time.sleep(0.05)  # シンクの受信を待つ
+    received = sum(sink.received for sink in sinks)
+    for sink in sinks:
+        sink.close()
+
+    summary = controller.instrumentation.summary()
+    total = {}
+    for stage in ("callback", "queue", "encode", "send", "total", "wire"):
+        # 全コマンド種別をまとめた値 (p99 / max は最悪の種別の値)
+        stats = [stages[stage] for stages in summary.values() if stage in stages]
+        if not stats:
+            continue
+        total[stage] = {"p50": max(s["p50"] for s in stats),
+                        "p99": max(s["p99"] for s in stats),
+                        "max": max(s["max"] for s in stats)}
+    sent = outcomes.get("sent", 0)
+    return {"name": name, "wire_format": wire_format, "rate": rate, "commands": count,
+            "outcomes": outcomes, "datagrams_received": received,
+            "submit_rate": count / submitted, "throughput": sent / elapsed,
+            "stages": total, "per_command": summary}
+
+
+SCENARIOS = (
+    # 名前, フォーマット, 件数, 送信レート[/s] (0 = 全速), 送信先数
+    ("burst-json", "json", 20000, 0, 1),
+    ("burst-binary", "binary", 20000, 0, 1),
+    ("paced-1k-json", "json", 2000, 1000, 1),
+    ("fanout8-binary", "binary", 5000, 0, 8),
+)
+
+
+def median_result(results):
+    """繰り返した結果のうち、スループットと各区間の値をそれぞれ中央値にする"""
+    result = dict(results[-1])
+    result["throughput"] = statistics.median(r["throughput"] for r in results)
+    result["stages"] = {
+        stage: {key: statistics.median(r["stages"][stage][key] for r in results)
+                for key in values}
+        for stage, values in results[-1]["stages"].items()}
+    result["repeat"] = len(results)
+    return result
+
+
+def print_result(result):
+    stages = result["stages"]
+    print(f"{result['name']:<16}{result['throughput']:>10.0f}/s"
+          f"{result['datagrams_received']:>10}"
+          + "".join(f"{stages[stage]['p50'] * 1e6:>10.1f}{stages[stage]['p99'] * 1e6:>9.1f}"
+                    for stage in ("queue", "total"))
+          + f"{stages['total']['max'] * 1e6:>10.1f}")
+
+
+def compare(results, baseline, tolerance):
+    """baseline より悪化した項目を表示し、悪化があれば True を返す"""
+    previous = {result["name"]: result for result in baseline}
+    regressed = False
+    for result in results:
+        old = previous.get(result["name"])
+        if old is None:
+            continue
+        checks = [("throughput", old["throughput"], result["throughput"], False)]
+        if result["rate"]:
+            # 全速の条件の total はキューに溜まった待ち時間なので、
+            # テールレイテンシは一定レートで送る条件だけで比べる
+            checks.append(("total p99", old["stages"]["total"]["p99"],
+                           result["stages"]["total"]["p99"], True))
+        for label, before, after, lower_is_better in checks:
+            worse = after > before * (1 + tolerance) if lower_is_better \
+                else after < before * (1 - tolerance)
+            if worse:
+                regressed = True
+                print(f"REGRESSION {result['name']} {label}: {before:.6g} -> {after:.6g}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="各条件の件数に掛ける係数")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="各条件を繰り返す回数 (中央値を使う)")
+    parser.add_argument("--save", metavar="PATH", help="結果を JSON で保存する")
+    parser.add_argument("--compare", metavar="PATH",
+                        help="保存した結果と比べ、悪化していれば終了コード 1")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="悪化とみなす割合 (0.5 = 50%%)")
+    parser.add_argument("--verbose", action="store_true",
+                        help="送信ごとの Sent: ... の表示を抑えない")
+    args = parser.parse_args()
+    # 計測結果を使うので、config で無効にしていても計測する
+    config.SEND_INSTRUMENTATION = True
+
+    print(f"{'scenario':<16}{'sent/s':>12}{'received':>10}"
+          f"{'queue p50':>10}{'p99':>9}{'total p50':>10}{'p99':>9}{'max':>10}  [us]")
+    results = []
+    for name, wire_format, count, rate, targets in SCENARIOS:
+        count = max(int(count * args.scale), 4)
+        runs = []
+        for _ in range(max(args.repeat, 1)):
+            if args.verbose:
+                runs.append(run_scenario(name, wire_format, count, rate, targets))
+            else:
+                # 送信ごとの表示は計測対象ではないので捨てる
+                with contextlib.redirect_stdout(io.StringIO()):
+                    runs.append(run_scenario(name, wire_format, count, rate, targets))
+        result = median_result(runs)
+        print_result(result)
+        results.append(result)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            return 1
+        print("No regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
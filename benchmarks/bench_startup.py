@@ -0,0 +1,60 @@
+"""GUI なしの経路と GUI の経路のコールドスタート時間を比べる
+
+新しいインタープリタを起動して、送信できる状態になるまでの時間を計測する。
+GUI (Tk 初期化あり) はディスプレイがない環境では計測できない。
+
+    python3 -m benchmarks.bench_startup
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+
+CASES = {
+    "headless (controller)":
+        "from controller import GameController\n"
+        "GameController().close()",
+    "gui import only":
+        "import tkinter, gui",
+    "gui (Tk init)":
+        "import tkinter as tk\n"
+        "from gui import GameControllerGUI\n"
+        "root = tk.Tk()\n"
+        "GameControllerGUI(root).controller.close()\n"
+        "root.update()\n"
+        "root.destroy()",
+}
+
+
+def measure(code):
+    """1回分の起動から終了までの時間 [s] (失敗時は None)"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-B", "-c", code],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    elapsed = time.perf_counter() - start
+    return elapsed if result.returncode == 0 else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--number", type=int, default=10,
+                        help="各経路の起動回数")
+    args = parser.parse_args()
+
+    baseline = min(measure("pass") for _ in range(args.number))
+    print(f"interpreter baseline: {baseline * 1000:.1f} ms")
+    print(f"{'path':<24}{'min [ms]':>10}{'median [ms]':>13}{'over baseline':>15}")
+    for name, code in CASES.items():
+        times = [measure(code) for _ in range(args.number)]
+        if None in times:
+            print(f"{name:<24}{'unavailable (no display?)':>38}")
+            continue
+        print(f"{name:<24}{min(times) * 1000:>10.1f}"
+              f"{statistics.median(times) * 1000:>13.1f}"
+              f"{(min(times) - baseline) * 1000:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""ゲームコマンドのワイヤーフォーマット
+
+JSON 形式 (従来) と struct で詰めたバイナリ形式を選べる。
+どちらも同じ dict ({"type": "game_command", "command": ..., ...}) を入出力とし、
+ack を待つコマンドには seq を付ける。
+
+バイナリ形式はリトルエンディアンで、全パケット共通のヘッダを持つ。
+
+    version (uint8) | type (uint8) | seq (uint32, 0 = ack 不要)
+
+place_ball はヘッダの後に team (uint8) | x (float32) | y (float32) が続く。
+game_state (周期配信) はヘッダの後に state (uint8) | team (uint8, 255 = 配置なし) |
+x (float32) | y (float32) | counter (uint32) が続く。
+telemetry (ロボットから) はヘッダの後に team (uint8) | robot_id (uint8) |
+x | y | theta | battery (それぞれ float32) が続く。
+JSON は必ず '{' (0x7B) で始まるので、先頭バイトでどちらの形式か判別できる。
+"""
+import json
+import struct
+
+
+PROTOCOL_VERSION = 1
+
+# バイナリ形式の type コード
+TYPE_CODES = {
+    "emergency_stop": 0x01,
+    "start_game": 0x02,
+    "stop_game": 0x03,
+    "place_ball": 0x04,
+    "game_state": 0x10,
+    "telemetry": 0x20,
+    "ack": 0x80,
+}
+TYPE_NAMES = {code: name for name, code in TYPE_CODES.items()}
+
+TEAM_CODES = {"yellow": 0, "blue": 1}
+TEAM_NAMES = {code: name for name, code in TEAM_CODES.items()}
+NO_TEAM = 0xFF
+
+STATE_CODES = {"stopped": 0, "running": 1, "emergency_stop": 2}
+STATE_NAMES = {code: name for name, code in STATE_CODES.items()}
+
+HEADER = struct.Struct("<BBI")
+PLACE_BALL = struct.Struct("<BBIBff")
+GAME_STATE = struct.Struct("<BBIBBffI")
+TELEMETRY = struct.Struct("<BBIBBffff")
+FLOAT32_MAX = 3.4028234663852886e38  # float32 で表せる最大の有限値
+
+# 引数を持たないコマンド (送信のたびに dict を作らず使い回す)
+FIXED_COMMANDS = {
+    name: {"type": "game_command", "command": name}
+    for name in ("emergency_stop", "start_game", "stop_game")
+}
+
+
+class JsonCodec:
+    """従来の JSON 形式"""
+    name = "json"
+
+    def __init__(self):
+        # 固定コマンドは起動時に1回だけエンコードしておく
+        self._fixed = {name: json.dumps(data).encode('utf-8')
+                       for name, data in FIXED_COMMANDS.items()}
+
+    def encode(self, data, seq=None):
+        """dict をデータグラムのバイト列にする"""
+        if seq is None:
+            if data.get("command") in self._fixed and len(data) == 2:
+                return self._fixed[data["command"]]
+        else:
+            data = dict(data, seq=seq)
+        return json.dumps(data).encode('utf-8')
+
+    def encode_ack(self, seq):
+        return json.dumps({"type": "ack", "seq": seq}).encode('utf-8')
+
+    def decode(self, byte_data):
+        """データグラムのバイト列を dict に戻す"""
+        return json.loads(byte_data.decode('utf-8'))
+
+
+class BinaryCodec:
+    """struct で詰めた固定長のバイナリ形式"""
+    name = "binary"
+
+    def __init__(self):
+        # 固定コマンドは起動時に1回だけエンコードしておく
+        self._fixed = {name: HEADER.pack(PROTOCOL_VERSION, TYPE_CODES[name], 0)
+                       for name in FIXED_COMMANDS}
+
+    def encode(self, data, seq=None):
+        """dict をデータグラムのバイト列にする (詰められない値なら ValueError)"""
+        try:
+            return self._encode(data, seq)
+        except (OverflowError, struct.error) as e:
+            # float32 に収まらない座標など
+            raise ValueError(f"Cannot encode {data}: {e}")
+
+    def _encode(self, data, seq):
+        if data.get("type") == "game_state":
+            return self._encode_state(data)
+        if data.get("type") == "telemetry":
+            return TELEMETRY.pack(PROTOCOL_VERSION, TYPE_CODES["telemetry"], 0,
+                                  TEAM_CODES[data["team_color"]], data["robot_id"],
+                                  data["x"], data["y"], data.get("theta", 0.0),
+                                  data.get("battery", 0.0))
+        command = data.get("command")
+        if command in self._fixed:
+            if seq is None:
+                return self._fixed[command]
+            return HEADER.pack(PROTOCOL_VERSION, TYPE_CODES[command], seq)
+        if command == "place_ball":
+            team_code = TEAM_CODES.get(data.get("team_color"))
+            if team_code is None:
+                raise ValueError(f"Unknown team color: {data.get('team_color')}")
+            return PLACE_BALL.pack(PROTOCOL_VERSION, TYPE_CODES[command], seq or 0,
+                                   team_code, data["x"], data["y"])
+        raise ValueError(f"Command not supported by binary format: {command}")
+
+    def encode_ack(self, seq):
+        return HEADER.pack(PROTOCOL_VERSION, TYPE_CODES["ack"], seq)
+
+    def _encode_state(self, data):
+        placement = data.get("ball_placement")
+        if placement is None:
+            team_code, x, y = NO_TEAM, 0.0, 0.0
+        else:
+            team_code = TEAM_CODES[placement["team_color"]]
+            x, y = placement["x"], placement["y"]
+        return GAME_STATE.pack(PROTOCOL_VERSION, TYPE_CODES["game_state"], 0,
+                               STATE_CODES[data["state"]], team_code, x, y,
+                               data["counter"])
+
+    def decode(self, byte_data):
+        """データグラムのバイト列を dict に戻す"""
+        try:
+            version, type_code, seq = HEADER.unpack_from(byte_data)
+        except struct.error as e:
+            raise ValueError(f"Truncated datagram: {e}")
+        if version != PROTOCOL_VERSION:
+            raise ValueError(f"Unsupported protocol version: {version}")
+        name = TYPE_NAMES.get(type_code)
+        if name is None:
+            raise ValueError(f"Unknown type code: {type_code:#04x}")
+
+        if name == "ack":
+            return {"type": "ack", "seq": seq}
+        if name == "game_state":
+            try:
+                _, _, _, state_code, team_code, x, y, counter = \
+                    GAME_STATE.unpack_from(byte_data)
+            except struct.error as e:
+                raise ValueError(f"Truncated datagram: {e}")
+            placement = None
+            if team_code != NO_TEAM:
+                placement = {"team_color": TEAM_NAMES.get(team_code), "x": x, "y": y}
+            return {"type": "game_state", "state": STATE_NAMES.get(state_code),
+                    "ball_placement": placement, "counter": counter}
+        if name == "telemetry":
+            try:
+                _, _, _, team_code, robot_id, x, y, theta, battery = \
+                    TELEMETRY.unpack_from(byte_data)
+            except struct.error as e:
+                raise ValueError(f"Truncated datagram: {e}")
+            return {"type": "telemetry", "team_color": TEAM_NAMES.get(team_code),
+                    "robot_id": robot_id, "x": x, "y": y, "theta": theta,
+                    "battery": battery}
+        data = {"type": "game_command", "command": name}
+        if name == "place_ball":
+            try:
+                _, _, _, team_code, x, y = PLACE_BALL.unpack_from(byte_data)
+            except struct.error as e:
+                raise ValueError(f"Truncated datagram: {e}")
+            data.update(x=x, y=y, team_color=TEAM_NAMES.get(team_code))
+        if seq:
+            data["seq"] = seq
+        return data
+
+
+# コーデックは状態を持たないので、起動時に1つずつ作って共有する
+CODECS = {codec.name: codec for codec in (JsonCodec(), BinaryCodec())}
+
+
+def get_codec(name):
+    """名前 ("json" / "binary") からコーデックを取得する"""
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(f"Unknown wire format: {name}")
+
+
+def detect_codec(byte_data):
+    """受信したデータグラムの先頭バイトから形式に合うコーデックを選ぶ"""
+    if byte_data[:1] == b"{":
+        return CODECS["json"]
+    return CODECS["binary"]
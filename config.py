@@ -3,3 +3,52 @@ GAME_COMMAND_LISTEN_PORT = 50008  # << 新しいポート >>
 
 # ゲームコントローラーがコマンドを送信する相手 (main.py が動いているPCのIP)
 LOCAL_IP = "127.0.0.1"  # << main.py が動くPCのIPに変更が必要な場合あり >>
+
+# --- 重要コマンドの確実な配送 (ack + 再送) ---
+RELIABLE_DELIVERY = False  # True にすると重要コマンドに seq を付けて ack を待つ
+RELIABLE_COMMANDS = ("emergency_stop", "stop_game")  # ack を待つコマンド
+RETRANSMIT_MAX_TRIES = 5  # 初回送信を含む最大送信回数
+RTO_INITIAL = 0.05  # RTT 計測前の再送タイムアウト [s]
+RTO_MIN = 0.05  # 再送タイムアウトの下限 [s] (GIL の切り替え間隔 5 ms より十分長くする)
+RTO_MAX = 1.0  # 再送タイムアウトの上限 [s]
+EMERGENCY_STOP_BURST = 3  # emergency_stop を1回の送信で連続送出する個数
+
+# --- ワイヤーフォーマット ---
+WIRE_FORMAT = "json"  # "json" (従来) / "binary" (struct で詰めた固定長形式)
+
+# --- 送信先 ---
+# 1つのコマンドを一覧の送信先すべてに送る。groups でフィールドやチームごとにまとめておくと、
+# GUI でグループを選んでそのグループにだけ送れる。
+# host にはブロードキャスト ("broadcast": True を付ける) やマルチキャストアドレスも指定できる
+# (これらの送信先からは ack を待たない)。
+TARGETS = [
+    {"name": "local", "host": LOCAL_IP, "port": GAME_COMMAND_LISTEN_PORT,
+     "groups": ["field1"]},
+]
+MULTICAST_TTL = 1  # マルチキャストを同じセグメント内に留める
+TARGET_STATS_REFRESH_MS = 500  # GUI の送信先統計の更新間隔 [ms]
+
+# --- コマンドラインツール (python3 -m controller) ---
+SCRIPT_SPIN_MARGIN = 0.002  # スクリプトの各ステップの直前に busy-wait する時間 [s]
+
+# --- ゲーム状態の周期配信 ---
+STATE_BROADCAST_HZ = 60  # 現在のゲーム状態を送信先に配信する周期 [Hz] (0 で無効)
+
+# --- ロボットからのテレメトリ受信 ---
+TELEMETRY_LISTEN_PORT = 50009  # ロボットが状態・テレメトリを送ってくるポート
+TELEMETRY_HISTORY = 256  # ロボットごとに保持する直近のサンプル数
+TELEMETRY_REFRESH_MS = 50  # GUI のテレメトリ表示を更新する最短間隔 [ms] (20 fps)
+
+# --- フィールド表示 (GUI) ---
+# ボール配置の X, Y と同じ単位 [m] で、フィールド中心が原点
+FIELD_LENGTH = 9.0  # << 使うフィールドに合わせる >>
+FIELD_WIDTH = 6.0  # << 使うフィールドに合わせる >>
+FIELD_MARGIN = 0.3  # フィールドの外側に表示する余白
+FIELD_CANVAS_WIDTH = 540  # キャンバスの幅 [px]
+PLACE_BALL_STREAM_HZ = 30  # ドラッグ中に place_ball を送る上限レート [Hz]
+
+# --- 試合ログ ---
+MATCH_LOG_DIR = "logs"  # GUI が送信したデータグラムを記録するディレクトリ (None で記録しない)
+
+# --- 送信経路の計測 ---
+SEND_INSTRUMENTATION = True  # コマンド種別・区間ごとの所要時間のヒストグラムを取る
@@ -0,0 +1,298 @@
+"""GUI を使わないゲームコントローラー本体とコマンドラインツール
+
+コマンドの組み立てと送信を GameController にまとめ、GUI・自動化スクリプト・CI から
+同じ経路でコマンドを送れるようにする。tkinter は読み込まず、asyncio も
+asyncio API を使うときまで読み込まない。
+
+    python3 -m controller emergency_stop
+    python3 -m controller place_ball yellow 1.0 -0.5
+    python3 -m controller run examples/match.txt
+"""
+import math
+import config
+from codec import FIXED_COMMANDS, FLOAT32_MAX
+from gamestate import GameState, StateBroadcaster
+from matchlog import MatchLogWriter
+from sender import CommandSender
+from targets import TargetRegistry
+from telemetry import TelemetryReceiver
+
+
+TEAM_COLORS = ("yellow", "blue")
+
+
+class GameController:
+    """ゲームコマンドを組み立てて送信する (表示を持たない)
+
+    送信は常駐の CommandSender が行うので、同期メソッドはキューに入れてすぐ戻る。
+    asyncio から使う場合は send_async() などのコルーチンで最終結果を待てる。
+    送信したコマンドは GameState に反映され、state_rate_hz > 0 なら一定周期で配信される。
+    match_log にパスを渡すと、送信したデータグラムをすべて試合ログに記録する。
+    """
+
+    def __init__(self, targets=None, on_event=None,
+                 reliable=config.RELIABLE_DELIVERY, wire_format=config.WIRE_FORMAT,
+                 state_rate_hz=config.STATE_BROADCAST_HZ, match_log=None):
+        self.targets = targets if targets is not None else \
+            TargetRegistry.from_config(config.TARGETS)
+        # ログを作れなかった場合にスレッドを残さないように、送信ワーカーより先に開く
+        self.match_log = None if match_log is None else MatchLogWriter(match_log)
+        # on_event(event, data, info) は送信スレッドから呼ばれる (CommandSender と同じ)
+        self.sender = CommandSender(self.targets, on_event=on_event,
+                                    reliable=reliable, wire_format=wire_format)
+        # 送信経路の区間ごとの所要時間 (config.SEND_INSTRUMENTATION が無効なら None)
+        self.instrumentation = self.sender.instrumentation
+        self.sender.match_log = self.match_log
+        self.state = GameState()
+        self.broadcaster = None
+        self.telemetry = None  # start_telemetry() で受信を始める
+        if state_rate_hz > 0:
+            self.broadcaster = StateBroadcaster(
+                self.state, self.sender, state_rate_hz)
+
+    def start_telemetry(self, port=config.TELEMETRY_LISTEN_PORT, on_update=None):
+        """ロボットからのテレメトリの受信を始める (ポートが使えなければ OSError)"""
+        self.telemetry = TelemetryReceiver(
+            port, history=config.TELEMETRY_HISTORY, on_update=on_update)
+        return self.telemetry
+
+    def start_match_log(self, path):
+        """送信したデータグラムの記録を始める (ファイルを作れなければ OSError)"""
+        match_log = MatchLogWriter(path)
+        previous, self.match_log = self.match_log, match_log
+        self.sender.match_log = match_log
+        if previous is not None:
+            previous.close()
+        return match_log
+
+    def close(self):
+        if self.telemetry is not None:
+            self.telemetry.close()
+        if self.broadcaster is not None:
+            self.broadcaster.close()
+        self.sender.close()
+        if self.match_log is not None:
+            self.match_log.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # --- コマンドの組み立て ---
+
+    @staticmethod
+    def build_command(command, *args):
+        """コマンド名と引数から送信する dict を作る"""
+        if command in FIXED_COMMANDS:
+            if args:
+                raise ValueError(f"{command} takes no arguments")
+            return FIXED_COMMANDS[command]
+        if command == "place_ball":
+            if len(args) != 3:
+                raise ValueError("place_ball takes TEAM_COLOR X Y")
+            return _place_ball(*args)
+        raise ValueError(f"Unknown command: {command}")
+
+    # --- 同期API (どのスレッドからでも呼べる) ---
+
+    def send(self, data, done=None, pressed_at=None):
+        """コマンドを送信キューに入れる (不正な place_ball なら ValueError)
+
+        pressed_at には GUI の操作の時刻 (time.perf_counter) を渡す (計測用)。
+        """
+        if data.get("command") == "place_ball":
+            # 不正な配置を状態に反映すると、以後の周期配信がすべて送れなくなるので、
+            # 先に確かめて座標を float にした dict に置き換える
+            data = _place_ball(data.get("team_color"), data.get("x"), data.get("y"))
+        # 次の周期配信から新しい状態になるように、キューに入れる前に反映する
+        self.state.apply(data)
+        return self.sender.submit(data, done, pressed_at)
+
+    def emergency_stop(self, pressed_at=None):
+        return self.send(FIXED_COMMANDS["emergency_stop"], pressed_at=pressed_at)
+
+    def start_game(self, pressed_at=None):
+        return self.send(FIXED_COMMANDS["start_game"], pressed_at=pressed_at)
+
+    def stop_game(self, pressed_at=None):
+        return self.send(FIXED_COMMANDS["stop_game"], pressed_at=pressed_at)
+
+    def place_ball(self, team_color, x, y, pressed_at=None):
+        return self.send(self.build_command("place_ball", team_color, x, y),
+                         pressed_at=pressed_at)
+
+    # --- asyncio API ---
+
+    async def send_async(self, data):
+        """コマンドを送信し、最終結果 (event, info) を待つ
+
+        event は "sent" / "acked" / "timeout" / "failed" / "superseded" / "cancelled"。
+        """
+        return await self._submit(data)
+
+    def _submit(self, data):
+        """コマンドをその場でキューに入れ、最終結果が入る Future を返す"""
+        import asyncio  # 同期APIだけを使う GUI などが読み込み時間を払わないようにする
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def done(event, info):
+            # 送信スレッドから呼ばれるので、イベントループのスレッドで結果を入れる
+            loop.call_soon_threadsafe(_set_result, future, (event, info))
+
+        if not self.send(data, done):
+            future.set_result(("cancelled", None))
+        return future
+
+    async def run_script(self, steps, spin=config.SCRIPT_SPIN_MARGIN):
+        """(時刻[s], コマンド dict) の列を、開始からの時刻どおりに送信する
+
+        時刻の直前までは asyncio.sleep で待ち、最後の spin 秒だけ busy-wait して
+        タイマーの粒度による遅れを抑える。各ステップの (時刻, dict, 遅れ[s], 結果) を返す。
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        pending = []
+        for at, data in steps:
+            deadline = start + at
+            delay = deadline - loop.time() - spin
+            if delay > 0:
+                await asyncio.sleep(delay)
+            while loop.time() < deadline:
+                pass
+            future = self._submit(data)
+            pending.append((at, data, loop.time() - deadline, future))
+        return [(at, data, lateness, await future)
+                for at, data, lateness, future in pending]
+
+
+def _place_ball(team_color, x, y):
+    """place_ball の dict を作る (送れない値なら ValueError)"""
+    if team_color not in TEAM_COLORS:
+        raise ValueError(f"Invalid team color: {team_color}")
+    try:
+        x, y = float(x), float(y)
+    except TypeError:
+        raise ValueError(f"Invalid coordinates: {x}, {y}")
+    # バイナリ形式でも送れるように、float32 に収まる有限の値だけを受け付ける
+    for value in (x, y):
+        if not math.isfinite(value) or abs(value) > FLOAT32_MAX:
+            raise ValueError(f"Coordinate out of range: {value}")
+    return {"type": "game_command", "command": "place_ball",
+            "x": x, "y": y,
+            "team_color": team_color}
+
+
+def _set_result(future, result):
+    if not future.done():
+        future.set_result(result)
+
+
+def parse_script(lines):
+    """試合シーケンスのスクリプトを (時刻[s], コマンド dict) の列にする
+
+    1行に "時刻 コマンド [引数...]" を書く。時刻は開始からの秒数で、
+    "+0.5" のように + を付けると直前の行からの相対時刻になる。"#" 以降はコメント。
+    """
+    steps = []
+    at = 0.0
+    for lineno, line in enumerate(lines, start=1):
+        fields = line.split("#", 1)[0].split()
+        if not fields:
+            continue
+        try:
+            if len(fields) < 2:
+                raise ValueError("expected TIME COMMAND [ARGS...]")
+            time_str, command, args = fields[0], fields[1], fields[2:]
+            if time_str.startswith("+"):
+                at += float(time_str[1:])
+            else:
+                at = float(time_str)
+            if steps and at < steps[-1][0]:
+                raise ValueError("time goes backwards")
+            steps.append((at, GameController.build_command(command, *args)))
+        except ValueError as e:
+            raise ValueError(f"line {lineno}: {e}")
+    return steps
+
+
+async def _run_cli(args):
+    if args.target:
+        # コマンドラインで指定した送信先だけに送る
+        targets = TargetRegistry.from_specs(args.target, config.GAME_COMMAND_LISTEN_PORT)
+    else:
+        targets = TargetRegistry.from_config(config.TARGETS)
+    if args.group:
+        targets.select(args.group)
+
+    with GameController(targets, reliable=args.reliable, wire_format=args.wire_format,
+                        state_rate_hz=args.state_rate, match_log=args.log) as controller:
+        if args.command == "run":
+            with open(args.args[0], encoding="utf-8") as f:
+                steps = parse_script(f)
+            results = await controller.run_script(steps)
+        else:
+            data = GameController.build_command(args.command, *args.args)
+            results = [(0.0, data, 0.0, await controller.send_async(data))]
+
+    failed = 0
+    for at, data, lateness, (event, info) in results:
+        detail = ""
+        if event == "acked":
+            detail = f" RTT {info * 1000:.2f} ms"
+        elif event in ("failed", "timeout"):
+            failed += 1
+            detail = f" ({info})"
+        print(f"t={at:8.3f}s late={lateness * 1000:6.3f} ms "
+              f"{data['command']}: {event}{detail}")
+
+    instrumentation = controller.instrumentation
+    if instrumentation is not None:
+        if args.stats:
+            print(instrumentation.report())
+        if args.stats_export:
+            instrumentation.export(args.stats_export)
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    import argparse
+    import asyncio
+
+    parser = argparse.ArgumentParser(
+        prog="python3 -m controller", description="Send game commands without the GUI.")
+    parser.add_argument("command", choices=sorted(FIXED_COMMANDS) + ["place_ball", "run"],
+                        help="command to send, or 'run SCRIPT' to play a match sequence")
+    parser.add_argument("args", nargs="*",
+                        help="place_ball: TEAM_COLOR X Y / run: SCRIPT")
+    parser.add_argument("--target", action="append",
+                        help="HOST[:PORT] to send to instead of config.TARGETS (repeatable)")
+    parser.add_argument("--group", help="target group to send to")
+    parser.add_argument("--reliable", action="store_true", default=config.RELIABLE_DELIVERY,
+                        help="wait for acks of critical commands")
+    parser.add_argument("--wire-format", choices=("json", "binary"),
+                        default=config.WIRE_FORMAT)
+    parser.add_argument("--state-rate", type=float, default=config.STATE_BROADCAST_HZ,
+                        help="game state broadcast rate in Hz while running (0 to disable)")
+    parser.add_argument("--log", help="record every sent datagram to this match log")
+    parser.add_argument("--stats", action="store_true",
+                        help="print send-path latency histograms when done")
+    parser.add_argument("--stats-export", metavar="PATH",
+                        help="write send-path latency histograms to a JSON file")
+    args = parser.parse_args(argv)
+    if args.command == "run" and len(args.args) != 1:
+        parser.error("run takes exactly one SCRIPT")
+
+    try:
+        return asyncio.run(_run_cli(args))
+    except (OSError, ValueError) as e:
+        parser.exit(2, f"error: {e}\n")
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,106 @@
+import math
+import tkinter as tk
+
+
+TEAM_FILL = {"yellow": "#f2d21b", "blue": "#2a6fdb"}
+ROBOT_RADIUS = 0.09  # [m]
+BALL_RADIUS = 0.0215  # [m]
+
+
+class FieldCanvas(tk.Canvas):
+    """フィールドを表示し、クリック/ドラッグでボール配置位置を指定するキャンバス
+
+    フィールドは最初に1回だけ描き、ボール配置位置やロボットのマーカーは
+    coords() で動かすだけにして毎回描き直さない。
+    座標はフィールド中心が原点、x はフィールドの長辺方向、y は上向き [m]。
+    on_target(x, y) はクリックとドラッグ中のマウスの移動のたびに (GUIスレッドで) 呼ばれる。
+    """
+
+    def __init__(self, master, field_length, field_width, margin, pixel_width,
+                 on_target=None):
+        self.field_length = field_length
+        self.field_width = field_width
+        self.pixels_per_meter = pixel_width / (field_length + 2 * margin)  # [px/m]
+        pixel_height = round((field_width + 2 * margin) * self.pixels_per_meter)
+        super().__init__(master, width=pixel_width, height=pixel_height,
+                         background="#1f7a35", highlightthickness=0)
+        self.center = (pixel_width / 2, pixel_height / 2)
+        self.on_target = on_target
+
+        self._draw_field()
+        self._target = self.create_oval(0, 0, 0, 0, fill="orange", outline="white",
+                                        width=2, state=tk.HIDDEN)
+        self._robots = {}  # (team_color, robot_id) -> (本体, 向き, 番号) のアイテムID
+
+        self.bind("<ButtonPress-1>", self._on_mouse)
+        self.bind("<B1-Motion>", self._on_mouse)
+
+    def to_pixel(self, x, y):
+        cx, cy = self.center
+        return cx + x * self.pixels_per_meter, cy - y * self.pixels_per_meter
+
+    def to_field(self, px, py):
+        """ピクセル座標をフィールド座標にする (フィールドの外はフィールドの端に丸める)"""
+        cx, cy = self.center
+        half_length = self.field_length / 2
+        half_width = self.field_width / 2
+        x = min(max((px - cx) / self.pixels_per_meter, -half_length), half_length)
+        y = min(max((cy - py) / self.pixels_per_meter, -half_width), half_width)
+        return x, y
+
+    def set_target(self, x, y):
+        """ボール配置位置のマーカーを動かす"""
+        px, py = self.to_pixel(x, y)
+        # 小さすぎると見えないので最低 5px にする
+        r = max(BALL_RADIUS * self.pixels_per_meter * 2, 5)
+        self.coords(self._target, px - r, py - r, px + r, py + r)
+        self.itemconfigure(self._target, state=tk.NORMAL)
+
+    def update_robot(self, team_color, robot_id, x, y, theta):
+        """ロボットのマーカーを動かす (初めてのロボットならマーカーを作る)"""
+        key = (team_color, robot_id)
+        items = self._robots.get(key)
+        if items is None:
+            items = (self.create_oval(0, 0, 0, 0, fill=TEAM_FILL.get(team_color, "gray"),
+                                      outline="black"),
+                     self.create_line(0, 0, 0, 0, fill="black", width=2),
+                     self.create_text(0, 0, text=str(robot_id), fill="black",
+                                      font=("TkDefaultFont", 8, "bold")))
+            self._robots[key] = items
+            # ボール配置位置のマーカーは常にロボットより手前に表示する
+            self.tag_raise(self._target)
+        body, heading, label = items
+        px, py = self.to_pixel(x, y)
+        r = ROBOT_RADIUS * self.pixels_per_meter
+        self.coords(body, px - r, py - r, px + r, py + r)
+        if not math.isfinite(theta):
+            self.coords(heading, px, py, px, py)
+        else:
+            self.coords(heading, px, py,
+                        px + r * math.cos(theta), py - r * math.sin(theta))
+        self.coords(label, px, py - r - 6)
+
+    def _draw_field(self):
+        line = {"fill": "white", "width": 2}
+        half_length = self.field_length / 2
+        half_width = self.field_width / 2
+        x0, y0 = self.to_pixel(-half_length, half_width)
+        x1, y1 = self.to_pixel(half_length, -half_width)
+        self.create_rectangle(x0, y0, x1, y1, outline="white", width=2)
+        cx, cy = self.center
+        self.create_line(cx, y0, cx, y1, **line)
+        r = 0.5 * self.pixels_per_meter
+        self.create_oval(cx - r, cy - r, cx + r, cy + r, outline="white", width=2)
+        # ゴール前のエリア (長辺方向の両端)
+        depth = 1.0 * self.pixels_per_meter
+        half_area = 1.0 * self.pixels_per_meter
+        self.create_rectangle(x0, cy - half_area, x0 + depth, cy + half_area, outline="white",
+                              width=2)
+        self.create_rectangle(x1 - depth, cy - half_area, x1, cy + half_area, outline="white",
+                              width=2)
+
+    def _on_mouse(self, event):
+        x, y = self.to_field(event.x, event.y)
+        self.set_target(x, y)
+        if self.on_target is not None:
+            self.on_target(x, y)
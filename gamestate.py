@@ -0,0 +1,121 @@
+import math
+import threading
+import time
+
+
+class GameState:
+    """コントローラー側で保持する正式なゲーム状態
+
+    送信したコマンドで更新し、StateBroadcaster が一定周期で配信する。
+    パケットを取りこぼしたり再起動したロボットも、次の配信で現在の状態が分かる。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.state = "stopped"  # "stopped" / "running" / "emergency_stop"
+        self.ball_placement = None  # {"team_color", "x", "y"} または None
+        self.counter = 0  # 反映したコマンドの数 (ロボット側でコマンドの取りこぼしを検知できる)
+
+    def apply(self, data):
+        """送信するコマンドを状態に反映する"""
+        command = data.get("command")
+        with self._lock:
+            if command == "emergency_stop":
+                self.state = "emergency_stop"
+            elif command == "start_game":
+                self.state = "running"
+            elif command == "stop_game":
+                self.state = "stopped"
+            elif command == "place_ball":
+                self.ball_placement = {"team_color": data["team_color"],
+                                       "x": data["x"], "y": data["y"]}
+            else:
+                return
+            self.counter = (self.counter + 1) & 0xFFFFFFFF
+
+    def message(self):
+        """配信するメッセージ (dict) を作る"""
+        with self._lock:
+            return {"type": "game_state", "state": self.state,
+                    "ball_placement": self.ball_placement,
+                    "counter": self.counter}
+
+
+class JitterStats:
+    """周期送信の予定時刻からの遅れの統計"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.missed = 0  # 遅れすぎて飛ばした周期の数
+        self.mean = 0.0
+        self.max = 0.0
+        self._m2 = 0.0  # 分散計算用 (Welford 法)
+
+    def add(self, lateness):
+        self.count += 1
+        delta = lateness - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (lateness - self.mean)
+        if lateness > self.max:
+            self.max = lateness
+
+    @property
+    def stddev(self):
+        return math.sqrt(self._m2 / self.count) if self.count > 1 else 0.0
+
+    def summary(self):
+        """表示用の dict (単位は秒)"""
+        return {"count": self.count, "missed": self.missed, "mean": self.mean,
+                "stddev": self.stddev, "max": self.max}
+
+
+class StateBroadcaster:
+    """GameState を一定周期で送信するスレッド
+
+    予定時刻は開始時刻 + k * 周期 の絶対時刻 (time.monotonic) で決めるので、
+    1回の遅れが次の周期に累積しない。1周期以上遅れた場合は、その間の周期を飛ばして位相を保つ。
+    Tk の mainloop とは別スレッドなので、GUI が処理中でも配信は止まらない。
+    """
+
+    def __init__(self, state, sender, rate_hz):
+        self.state = state
+        self.sender = sender
+        self.period = 1.0 / rate_hz
+        self.stats = JitterStats()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="state-broadcast", daemon=True)
+        self._thread.start()
+
+    @property
+    def rate_hz(self):
+        return 1.0 / self.period
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+
+    def _run(self):
+        """配信スレッド本体"""
+        clock = time.monotonic
+        period = self.period
+        deadline = clock() + period
+        while True:
+            wait = deadline - clock()
+            if wait > 0 and self._stop.wait(wait):
+                return
+            if self._stop.is_set():
+                return
+            now = clock()
+            self.stats.add(now - deadline)
+            self.sender.submit_state(self.state.message())
+
+            deadline += period
+            if now - deadline > period:
+                # 大きく遅れたら追いつくまで連続送信せず、間の周期を飛ばす
+                missed = int((now - deadline) // period) + 1
+                self.stats.missed += missed
+                deadline += missed * period
@@ -1,21 +1,26 @@
 import tkinter as tk
 from tkinter import ttk
-import socket
-import json
-import threading
+from tkinter import filedialog
 import sys
+import time
 import config
+from codec import get_codec
+from controller import GameController
+from field_canvas import FieldCanvas
+from matchlog import new_log_path
 
 
 class GameControllerGUI:
     def __init__(self, master):
         self.master = master
         master.title("Robot Game Controller")
-        master.geometry("500x600")  # ウィンドウの初期サイズ設定
+        master.geometry("1120x880")  # ウィンドウの初期サイズ設定
 
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.target_ip = config.LOCAL_IP
-        self.target_port = config.GAME_COMMAND_LISTEN_PORT
+        # コマンドの組み立てと送信は GameController に任せる
+        self._stats_after_id = None
+        self.controller = GameController(on_event=self._on_send_event)
+        self.targets = self.controller.targets  # 送信先の一覧 (送信スレッドと共有する)
+        self.sender = self.controller.sender  # 送信ソケットは常駐の送信ワーカーが所有する
 
         # ウィンドウサイズ変更時の挙動を設定
         master.columnconfigure(0, weight=1)
@@ -29,25 +34,52 @@ class GameControllerGUI:
         # メインフレーム内のグリッド設定 (列方向の中央寄せと拡張)
         main_frame.columnconfigure(0, weight=1)
 
-        # --- 通信情報表示 ---
+        # --- 送信先 ---
         ip_frame = ttk.LabelFrame(
-            main_frame, text="Target IP", padding="10")
+            main_frame, text="Targets", padding="10")
         ip_frame.grid(row=1, column=0, pady=5, sticky=(tk.W, tk.E))
         ip_frame.columnconfigure(0, weight=1)  # ボタンが横いっぱいに広がるように
         main_frame.rowconfigure(2, weight=0)  # 固定サイズ
+
+        # 送信するグループの選択
+        group_frame = ttk.Frame(ip_frame)
+        group_frame.grid(row=0, column=0, columnspan=4,
+                         sticky=(tk.W, tk.E), pady=(0, 5))
+        ttk.Label(group_frame, text="Send to group:").grid(
+            row=0, column=0, sticky=tk.W, padx=(5, 5))
+        self.group_var = tk.StringVar(value=self.targets.active_group)
+        self.group_combo = ttk.Combobox(
+            group_frame, textvariable=self.group_var, state="readonly",
+            values=self.targets.groups())
+        self.group_combo.grid(row=0, column=1, sticky=tk.W)
+        self.group_combo.bind("<<ComboboxSelected>>", self.select_group)
+
+        # 送信先の追加 ("host" または "host:port")
         self.ip_entry = ttk.Entry(ip_frame)
-        self.ip_entry.insert(0, self.target_ip)  # デフォルト値を設定
-        self.ip_entry.grid(row=0, column=0, sticky=(tk.W, tk.E), padx=5)
+        self.ip_entry.insert(0, config.LOCAL_IP)  # デフォルト値を設定
+        self.ip_entry.grid(row=1, column=0, sticky=(tk.W, tk.E), padx=5)
 
-        ttk.Button(ip_frame, text="Update IP", command=lambda: self.update_ip("Custom")).grid(
-            row=0, column=1, sticky=(tk.W, tk.E), padx=5)
+        ttk.Button(ip_frame, text="Add Target", command=lambda: self.update_ip("Custom")).grid(
+            row=1, column=1, sticky=(tk.W, tk.E), padx=5)
         ttk.Button(ip_frame, text="Local IP", command=lambda: self.update_ip("Local")).grid(
-            row=0, column=2, sticky=(tk.W, tk.E), padx=5)
-
-        self.target_ip_label = ttk.Label(
-            ip_frame, text=f"Target IP: {self.target_ip}:{self.target_port}")
-        self.target_ip_label.grid(
-            row=1, column=0, columnspan=3, pady=(10, 10), sticky=tk.W)
+            row=1, column=2, sticky=(tk.W, tk.E), padx=5)
+        ttk.Button(ip_frame, text="Remove", command=self.remove_selected_targets).grid(
+            row=1, column=3, sticky=(tk.W, tk.E), padx=5)
+
+        # 送信先ごとの送信回数・失敗回数・送信時間
+        columns = ("address", "groups", "sent", "fails", "last", "max")
+        self.target_tree = ttk.Treeview(
+            ip_frame, columns=columns, height=4, selectmode="extended")
+        self.target_tree.heading("#0", text="Name")
+        self.target_tree.column("#0", width=80)
+        for column, text, width in (("address", "Address", 130), ("groups", "Groups", 70),
+                                    ("sent", "Sent", 45), ("fails", "Fails", 45),
+                                    ("last", "Last [us]", 60), ("max", "Max [us]", 60)):
+            self.target_tree.heading(column, text=text)
+            self.target_tree.column(column, width=width, anchor=tk.E
+                                    if column in ("sent", "fails", "last", "max") else tk.W)
+        self.target_tree.grid(row=2, column=0, columnspan=4,
+                              pady=(10, 0), sticky=(tk.W, tk.E))
 
         # --- ゲームコントロールボタン ---
         game_control_frame = ttk.LabelFrame(
@@ -77,6 +109,35 @@ class GameControllerGUI:
         self.stop_game_button.grid(
             row=2, column=0, pady=5, sticky=(tk.W, tk.E))
 
+        # 重要コマンドの ack 待ち・再送の切り替え
+        self.reliable_var = tk.BooleanVar(value=self.sender.reliable)
+        ttk.Checkbutton(game_control_frame, text="Reliable delivery (ack + retransmit)",
+                        variable=self.reliable_var, command=self.update_reliable).grid(
+            row=3, column=0, pady=5, sticky=tk.W)
+
+        # ワイヤーフォーマットの切り替え
+        format_frame = ttk.Frame(game_control_frame)
+        format_frame.grid(row=4, column=0, sticky=(tk.W, tk.E))
+        ttk.Label(format_frame, text="Wire format:").grid(
+            row=0, column=0, sticky=tk.W)
+        self.wire_format = tk.StringVar(value=self.sender.codec.name)
+        for column, name in enumerate(("json", "binary"), start=1):
+            ttk.Radiobutton(format_frame, text=name.upper(), variable=self.wire_format,
+                            value=name, command=self.update_wire_format).grid(
+                row=0, column=column, sticky=tk.W, padx=(5, 2))
+
+        # 送信経路の所要時間の表示・書き出し
+        stats_frame = ttk.Frame(game_control_frame)
+        stats_frame.grid(row=6, column=0, pady=(5, 0), sticky=(tk.W, tk.E))
+        ttk.Button(stats_frame, text="Dump Latency Stats", command=self.dump_latency_stats).grid(
+            row=0, column=0, sticky=tk.W, padx=(0, 5))
+        ttk.Button(stats_frame, text="Export Latency Stats...",
+                   command=self.export_latency_stats).grid(row=0, column=1, sticky=tk.W)
+
+        # ゲーム状態の周期配信の遅れ (ジッタ)
+        self.broadcast_label = ttk.Label(game_control_frame, text="")
+        self.broadcast_label.grid(row=5, column=0, pady=(5, 0), sticky=tk.W)
+
         # --- ボール配置コマンド ---
         placement_frame = ttk.LabelFrame(
             main_frame, text="Ball Placement", padding="10")
@@ -121,11 +182,61 @@ class GameControllerGUI:
         self.place_ball_custom_button.grid(
             row=1, column=4, sticky=(tk.N, tk.S, tk.E, tk.W), padx=5)
 
+        # --- フィールド (クリック/ドラッグでボール配置位置を指定) ---
+        field_frame = ttk.LabelFrame(
+            main_frame, text="Field (click or drag to place ball)", padding="10")
+        field_frame.grid(row=1, column=1, rowspan=5, padx=(10, 0), pady=5,
+                         sticky=(tk.N, tk.W))
+        self.field = FieldCanvas(
+            field_frame, config.FIELD_LENGTH, config.FIELD_WIDTH, config.FIELD_MARGIN,
+            config.FIELD_CANVAS_WIDTH, on_target=self._on_field_target)
+        self.field.grid(row=0, column=0)
+        # ドラッグ中の place_ball 送信の間引き用
+        self._stream_target = None  # まだ送っていない最新の位置
+        self._stream_after_id = None
+        self._last_stream_send = 0.0
+
+        # --- ロボットのテレメトリ ---
+        robot_frame = ttk.LabelFrame(
+            main_frame, text="Robots", padding="10")
+        robot_frame.grid(row=4, column=0, pady=5, sticky=(tk.W, tk.E))
+        robot_frame.columnconfigure(0, weight=1)
+        main_frame.rowconfigure(4, weight=0)  # 固定サイズ
+
+        columns = ("x", "y", "theta", "battery", "rate", "age")
+        self.robot_tree = ttk.Treeview(robot_frame, columns=columns, height=6)
+        self.robot_tree.heading("#0", text="Robot")
+        self.robot_tree.column("#0", width=80)
+        for column, text in (("x", "X"), ("y", "Y"), ("theta", "Theta"),
+                             ("battery", "Battery"), ("rate", "Rate [Hz]"),
+                             ("age", "Age [ms]")):
+            self.robot_tree.heading(column, text=text)
+            self.robot_tree.column(column, width=70, anchor=tk.E)
+        self.robot_tree.grid(row=0, column=0, sticky=(tk.W, tk.E))
+
         # --- ステータス表示 ---
         self.status_label = ttk.Label(main_frame, text="", anchor=tk.CENTER)
-        self.status_label.grid(row=4, column=0, pady=10, sticky=(tk.W, tk.E))
+        self.status_label.grid(row=5, column=0, pady=10, sticky=(tk.W, tk.E))
         # 最後の行（ステータスラベル）がウィンドウサイズ変更時に拡張されるように設定
-        main_frame.rowconfigure(5, weight=1)
+        main_frame.rowconfigure(6, weight=1)
+
+        # テレメトリの受信を始める (ポートが使えなくてもコマンド送信は続けられる)
+        try:
+            self.controller.start_telemetry(on_update=self._on_telemetry)
+        except OSError as e:
+            self.update_status_label(f"Telemetry disabled: {e}", "orange")
+        # 試合ログの記録を始める (ログを作れなくても EMERGENCY STOP などは送れるようにする)
+        if config.MATCH_LOG_DIR:
+            try:
+                match_log = self.controller.start_match_log(
+                    new_log_path(config.MATCH_LOG_DIR))
+                print(f"Recording sent commands to {match_log.path}")
+            except OSError as e:
+                print(f"Match log disabled: {e}")
+                self.update_status_label(f"Match log disabled: {e}", "orange")
+
+        # 送信先の一覧と統計の表示を始める
+        self.refresh_targets()
 
         # ウィンドウクローズ時の処理を設定
         master.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -133,60 +244,182 @@ class GameControllerGUI:
     def on_closing(self):
         """ウィンドウが閉じられそうになった時の処理"""
         print("Closing Game Controller GUI.")
-        # ソケットを閉じる
-        if self.sock:
-            self.sock.close()
+        # 送信ワーカーを止めてソケットを閉じる
+        if self.controller:
+            self.controller.close()
         self.master.destroy()
         sys.exit()  # プログラム全体を終了
 
-    def send_udp(self, data):
-        """UDP経由でJSONデータを送信する"""
-        # GUIスレッドをブロックしないように、送信処理を別スレッドで行う
-        threading.Thread(target=self._send_udp_threaded,
-                         args=(data,), daemon=True).start()
-
-    def _send_udp_threaded(self, data):
-        """UDP送信処理本体 (別スレッドで実行される)"""
-        try:
-            json_data = json.dumps(data)
-            byte_data = json_data.encode('utf-8')
-            self.sock.sendto(byte_data, (self.target_ip, self.target_port))
-            print(f"Sent: {data}")
-            # GUIの更新はGUIスレッドで行う必要がある
-            # .after(ms, callback) を使う
+    def _on_send_event(self, event, data, info):
+        """送信結果の通知 (送信スレッドから呼ばれる)"""
+        # GUIの更新はGUIスレッドで行う必要がある
+        # .after(ms, callback) を使う
+        if event == "sent":
+            notified_at = time.perf_counter()
             command_text = data.get('command', 'Unknown')
             target_text = data.get('team_color', 'All')
             status_msg = f"Sent {command_text} ({target_text})"
             if command_text == "place_ball":
                 status_msg += f" to ({data.get('x')}, {data.get('y')})"
-
+            status_msg += f" [{info * 1000:.2f} ms]"
+            self.master.after(0, self._show_sent_status,
+                              status_msg, command_text, notified_at)
+        elif event == "acked":
+            status_msg = f"Acked {data.get('command', 'Unknown')} (RTT {info * 1000:.2f} ms)"
             self.master.after(0, self.update_status_label, status_msg, "green")
-        except socket.error as e:
-            print(f"Failed to send command: {e}")
-            self.master.after(0, self.update_status_label,
-                              f"Send failed: {e}", "red")
-        except ValueError as e:  # JSON dumps error
-            print(f"Error encoding data: {e}")
-            self.master.after(0, self.update_status_label,
-                              f"Encoding error: {e}", "red")
-        except Exception as e:  # その他の予期せぬエラー
-            print(f"An unexpected error occurred during send: {e}")
+        elif event == "timeout":
+            status_msg = f"Timed out {data.get('command', 'Unknown')} (no ack after {info} tries)"
+            self.master.after(0, self.update_status_label, status_msg, "red")
+        else:
             self.master.after(0, self.update_status_label,
-                              f"Unexpected error: {e}", "red")
+                              f"Send failed: {info}", "red")
+
+    def _show_sent_status(self, text, command, notified_at):
+        """送信完了をステータスに表示し、通知から表示までの時間を記録する"""
+        self.update_status_label(text, "green")
+        if self.controller.instrumentation is not None:
+            self.controller.instrumentation.record(
+                command, "status", time.perf_counter() - notified_at)
+
+    def dump_latency_stats(self):
+        """送信経路の所要時間のヒストグラムをコンソールに表示する"""
+        if self.controller.instrumentation is None:
+            self.update_status_label("Latency instrumentation is disabled.", "orange")
+            return
+        print(self.controller.instrumentation.report())
+        self.update_status_label("Latency stats printed to console.", "green")
+
+    def export_latency_stats(self):
+        """送信経路の所要時間のヒストグラムを JSON ファイルに書き出す"""
+        if self.controller.instrumentation is None:
+            self.update_status_label("Latency instrumentation is disabled.", "orange")
+            return
+        path = filedialog.asksaveasfilename(
+            parent=self.master, defaultextension=".json",
+            initialfile=time.strftime("latency-%Y%m%d-%H%M%S.json"))
+        if not path:
+            return
+        try:
+            self.controller.instrumentation.export(path)
+        except OSError as e:
+            self.update_status_label(f"Export failed: {e}", "red")
+            return
+        self.update_status_label(f"Latency stats exported to {path}", "green")
 
     def update_ip(self, type):
-        """IPアドレスを更新する"""
-        new_ip = self.ip_entry.get()
+        """入力欄 ("host" または "host:port") の送信先を追加する"""
+        new_ip = self.ip_entry.get().strip()
         if type == "Local":
             new_ip = config.LOCAL_IP
-        if new_ip:
-            self.target_ip = new_ip
-            self.update_status_label(f"IP updated to {new_ip}", "green")
-            self.target_ip_label.config(
-                # ラベルを更新
-                text=f"Target IP: {self.target_ip}:{self.target_port}")
-        else:
+        if not new_ip:
             self.update_status_label("Invalid IP address.", "red")
+            return
+        try:
+            target = self.targets.add_spec(new_ip, config.GAME_COMMAND_LISTEN_PORT)
+        except ValueError as e:
+            self.update_status_label(f"Invalid target: {e}", "red")
+            return
+        self.update_status_label(
+            f"Target added: {target.addr[0]}:{target.port} ({target.kind})", "green")
+        self.refresh_targets()
+
+    def remove_selected_targets(self):
+        """一覧で選択されている送信先を削除する"""
+        selected = self.target_tree.selection()
+        if not selected:
+            self.update_status_label("No target selected.", "orange")
+            return
+        for name in selected:
+            self.targets.remove(name)
+        self.update_status_label(f"Removed {len(selected)} target(s).", "green")
+        self.refresh_targets()
+
+    def select_group(self, event=None):
+        """送信するグループを切り替える"""
+        self.targets.select(self.group_var.get())
+        count = len(self.targets.active_targets())
+        self.update_status_label(
+            f"Sending to group {self.targets.active_group} ({count} targets).", "green")
+
+    def refresh_targets(self):
+        """送信先の一覧を作り直す (追加・削除時)"""
+        self.target_tree.delete(*self.target_tree.get_children())
+        for target in self.targets.targets():
+            self.target_tree.insert("", tk.END, iid=target.name, text=target.name)
+        self.group_combo.config(values=self.targets.groups())
+        self.update_target_stats()
+
+    def update_target_stats(self):
+        """送信先ごとの統計を表示に反映する"""
+        # 送信のたびに更新すると GUI スレッドが詰まるので after で定期的にまとめて反映する
+        if self._stats_after_id is not None:
+            self.master.after_cancel(self._stats_after_id)
+        # 途中で例外が出ても定期更新が止まらないように、先に次回を予約する
+        self._stats_after_id = self.master.after(
+            config.TARGET_STATS_REFRESH_MS, self.update_target_stats)
+        for target in self.targets.targets():
+            last = "-" if target.last_send_time is None else \
+                f"{target.last_send_time * 1e6:.0f}"
+            address = f"{target.addr[0]}:{target.port}"
+            if target.kind != "unicast":
+                address += f" ({target.kind})"
+            self.target_tree.item(target.name, values=(
+                address, ",".join(target.groups), target.sent, target.failures,
+                last, f"{target.max_send_time * 1e6:.0f}"))
+        self.update_broadcast_stats()
+        # 受信が止まったロボットの経過時間もここで更新する
+        self.refresh_telemetry()
+
+    def _on_telemetry(self):
+        """テレメトリ受信の通知 (受信スレッドから、表示の更新1回につき1回だけ呼ばれる)"""
+        # パケットごとに表示を更新すると GUI のイベントキューがあふれるので、
+        # 一定間隔後にまとめて1回だけ更新する
+        self.master.after(config.TELEMETRY_REFRESH_MS, self.refresh_telemetry)
+
+    def refresh_telemetry(self):
+        """ロボットごとの最新のテレメトリを表示に反映する"""
+        telemetry = self.controller.telemetry
+        if telemetry is None:
+            return
+        telemetry.clear_dirty()
+        now = time.monotonic()
+        for (team_color, robot_id), buffer in list(telemetry.robots.items()):
+            sample = buffer.latest()
+            if sample is None:
+                continue  # まだ1件も入っていない
+            iid = f"{team_color}-{robot_id}"
+            if not self.robot_tree.exists(iid):
+                self.robot_tree.insert("", tk.END, iid=iid, text=iid)
+            self.field.update_robot(team_color, robot_id, sample['x'], sample['y'],
+                                    sample['theta'])
+            self.robot_tree.item(iid, values=(
+                f"{sample['x']:.3f}", f"{sample['y']:.3f}", f"{sample['theta']:.2f}",
+                f"{sample['battery']:.2f}", f"{buffer.rate():.0f}",
+                f"{(now - sample['t']) * 1000:.0f}"))
+
+    def update_broadcast_stats(self):
+        """ゲーム状態の周期配信の統計を表示する"""
+        broadcaster = self.controller.broadcaster
+        if broadcaster is None:
+            self.broadcast_label.config(text="State broadcast: disabled")
+            return
+        stats = broadcaster.stats
+        self.broadcast_label.config(
+            text=f"State broadcast {broadcaster.rate_hz:.0f} Hz: "
+                 f"late mean {stats.mean * 1000:.2f} / sd {stats.stddev * 1000:.2f} / "
+                 f"max {stats.max * 1000:.2f} ms, missed {stats.missed}")
+
+    def update_reliable(self):
+        """重要コマンドの確実な配送の有効/無効を切り替える"""
+        self.sender.reliable = self.reliable_var.get()
+        state = "enabled" if self.sender.reliable else "disabled"
+        self.update_status_label(f"Reliable delivery {state}.", "green")
+
+    def update_wire_format(self):
+        """送信に使うワイヤーフォーマットを切り替える"""
+        self.sender.codec = get_codec(self.wire_format.get())
+        self.update_status_label(
+            f"Wire format set to {self.sender.codec.name}.", "green")
 
     def update_status_label(self, text, color):
         """ステータスラベルを更新する (GUIスレッドから呼ばれる)"""
@@ -203,21 +436,45 @@ class GameControllerGUI:
 
     def send_emergency_stop_command(self):
         """EMERGENCY STOP コマンドを送信 (全ロボット対象)"""
-        command = {"type": "game_command", "command": "emergency_stop"}
-        self.send_udp(command)
+        self.controller.emergency_stop(pressed_at=time.perf_counter())
 
     def send_start_game_command(self):
         """START GAME コマンドを送信 (全ロボット対象)"""
-        command = {"type": "game_command", "command": "start_game"}
-        self.send_udp(command)
+        self.controller.start_game(pressed_at=time.perf_counter())
 
     def send_stop_game_command(self):
         """STOP GAME コマンドを送信 (全ロボット対象)"""
-        command = {"type": "game_command", "command": "stop_game"}
-        self.send_udp(command)
+        self.controller.stop_game(pressed_at=time.perf_counter())
+
+    def _on_field_target(self, x, y):
+        """フィールド上でボール配置位置が指定された (クリック/ドラッグ中のマウス移動ごと)"""
+        # 最新の位置だけを覚えておき、送信は上限レートに間引く (途中の位置は送らずに捨てる)
+        self._stream_target = (x, y)
+        if self._stream_after_id is not None:
+            return  # 予約済みの送信が最新の位置を送る
+        wait = self._last_stream_send + 1.0 / config.PLACE_BALL_STREAM_HZ - time.monotonic()
+        if wait <= 0:
+            self._send_stream_target()
+        else:
+            self._stream_after_id = self.master.after(
+                int(wait * 1000) + 1, self._send_stream_target)
+
+    def _send_stream_target(self):
+        """ドラッグ中の最新のボール配置位置を送信する"""
+        pressed_at = time.perf_counter()
+        self._stream_after_id = None
+        self._last_stream_send = time.monotonic()
+        x, y = (round(value, 3) for value in self._stream_target)
+        for entry, value in ((self.x_entry, x), (self.y_entry, y)):
+            entry.delete(0, tk.END)
+            entry.insert(0, str(value))
+        team_color = self.get_selected_team_color()
+        if team_color:
+            self.controller.place_ball(team_color, x, y, pressed_at=pressed_at)
 
     def send_place_ball_command_custom(self):
         """選択されているロボットに PLACE BALL コマンドを送信 (カスタム位置)"""
+        pressed_at = time.perf_counter()
         team_color = self.get_selected_team_color()
         if not team_color:
             return
@@ -233,13 +490,11 @@ class GameControllerGUI:
             x = float(x_str)
             y = float(y_str)
 
-            command = {"type": "game_command", "command": "place_ball",
-                       "x": x, "y": y,
-                       "team_color": team_color}
-            self.send_udp(command)
-        except ValueError:
-            self.update_status_label(
-                "Invalid X, Y input (not a number).", "red")
+            # GUIスレッドをブロックしないように、送信ワーカーのキューに入れるだけにする
+            self.controller.place_ball(team_color, x, y, pressed_at=pressed_at)
+            self.field.set_target(x, y)
+        except ValueError as e:
+            self.update_status_label(f"Invalid X, Y input: {e}", "red")
         except Exception as e:
             self.update_status_label(
                 f"An error occurred processing placement: {e}", "red")
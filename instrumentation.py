@@ -0,0 +1,111 @@
+"""送信経路の区間ごとの所要時間の計測
+
+コマンド種別ごと・区間ごとにヒストグラムを持ち、p50 / p99 / max を出せる。
+区間は次のとおり (いずれも秒で記録し、表示は us)。
+
+    callback  GUI の操作からキューに入れるまで (コマンドの組み立てと状態の反映、GUI のみ)
+    queue   キューに入れてから送信スレッドが取り出すまで
+    encode  取り出してからデータグラムにエンコードし終わるまで
+    send    全送信先への sendto が終わるまで
+    total   キューに入れてから全送信先への sendto が終わるまで
+    wire    GUI の操作から全送信先への sendto が終わるまで (GUI のみ)
+    status  送信の通知から GUI のステータス表示が更新されるまで (GUI のみ)
+"""
+import json
+import math
+import threading
+from array import array
+
+
+STAGES = ("callback", "queue", "encode", "send", "total", "wire", "status")
+
+
+class LatencyHistogram:
+    """対数スケールのバケットに数えるヒストグラム (バケット幅は約 5%)"""
+    MIN = 1e-7  # これより短い値は最初のバケットに入れる [s]
+    GROWTH = 1.05
+    BUCKETS = 480  # MIN * GROWTH ** BUCKETS がおよそ 1.5e3 s
+
+    def __init__(self):
+        self._counts = array('L', [0]) * self.BUCKETS
+        self._log_growth = math.log(self.GROWTH)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        if seconds > self.MIN:
+            i = min(int(math.log(seconds / self.MIN) / self._log_growth), self.BUCKETS - 1)
+        else:
+            i = 0
+        self._counts[i] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p):
+        """p パーセンタイル (そのバケットの上端、max を超えない)"""
+        if not self.count:
+            return 0.0
+        rank = math.ceil(self.count * p / 100)
+        seen = 0
+        for i, count in enumerate(self._counts):
+            seen += count
+            if seen >= rank:
+                return min(self.MIN * self.GROWTH ** (i + 1), self.max)
+        return self.max
+
+    def summary(self):
+        return {"count": self.count,
+                "mean": self.total / self.count if self.count else 0.0,
+                "p50": self.percentile(50), "p99": self.percentile(99),
+                "max": self.max}
+
+
+class SendInstrumentation:
+    """コマンド種別 x 区間ごとの LatencyHistogram"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # (command, stage) -> LatencyHistogram
+
+    def record(self, command, stage, seconds):
+        key = (command, stage)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def summary(self):
+        """{command: {stage: {count, mean, p50, p99, max}}} (単位は秒)"""
+        with self._lock:
+            items = sorted(self._histograms.items())
+            result = {}
+            for (command, stage), histogram in items:
+                result.setdefault(command, {})[stage] = histogram.summary()
+        return result
+
+    def report(self):
+        """表示用の表 (単位は us)"""
+        lines = [f"{'command':<16}{'stage':<8}{'count':>8}{'p50':>10}"
+                 f"{'p99':>10}{'max':>10}  [us]"]
+        for command, stages in self.summary().items():
+            for stage in STAGES:
+                stats = stages.get(stage)
+                if stats is None:
+                    continue
+                lines.append(f"{command:<16}{stage:<8}{stats['count']:>8}"
+                             f"{stats['p50'] * 1e6:>10.1f}{stats['p99'] * 1e6:>10.1f}"
+                             f"{stats['max'] * 1e6:>10.1f}")
+        return "\n".join(lines)
+
+    def export(self, path):
+        """summary() を JSON ファイルに書き出す"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
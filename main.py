@@ -1,8 +1,8 @@
-import tkinter as tk
-from gui import GameControllerGUI  # gui.py から GameControllerGUI クラスをインポート
-
-
 def main():
+    # tkinter は GUI を起動するときだけ読み込む (GUI なしで使う場合は python3 -m controller)
+    import tkinter as tk
+    from gui import GameControllerGUI  # gui.py から GameControllerGUI クラスをインポート
+
     root = tk.Tk()
     gui = GameControllerGUI(root)
     root.mainloop()
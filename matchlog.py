@@ -0,0 +1,216 @@
+"""送信したデータグラムを記録する追記専用のバイナリログ
+
+ログファイル (.mlog):
+    ヘッダ  magic "MSGCLOG1" | 開始時の壁時計 (float64, UNIX 秒)
+    レコード t_ns (uint64, ログ開始からの単調時計 [ns]) | length (uint16) | データグラム
+
+インデックス (.mlog.idx):
+    ヘッダ  magic "MSGCIDX1"
+    エントリ t_ns (uint64) | ログファイル内のレコードの位置 (uint64)
+
+インデックスは INDEX_INTERVAL_NS ごとに1件書くので、長い試合のログでも
+mmap したインデックスを二分探索して任意の時刻から読み始められる。
+いずれもリトルエンディアン。
+"""
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import deque
+
+
+LOG_MAGIC = b"MSGCLOG1"
+INDEX_MAGIC = b"MSGCIDX1"
+LOG_HEADER = struct.Struct("<8sd")
+RECORD = struct.Struct("<QH")
+INDEX_ENTRY = struct.Struct("<QQ")
+INDEX_INTERVAL_NS = 1_000_000_000  # インデックスを書く間隔 [ns]
+
+
+def index_path(path):
+    return path + ".idx"
+
+
+def new_log_path(directory):
+    """directory 内に起動時刻の名前で新しいログのパスを作る
+
+    同じ秒に起動したログがあれば "-2", "-3", ... を付けて別の名前にする。
+    """
+    base = os.path.join(directory, time.strftime("match-%Y%m%d-%H%M%S"))
+    path = base + ".mlog"
+    n = 2
+    while os.path.exists(path):
+        path = f"{base}-{n}.mlog"
+        n += 1
+    return path
+
+
+class MatchLogWriter:
+    """送信したデータグラムをログに追記する
+
+    record() はキューに入れるだけで戻るので、送信スレッドを止めない。
+    ファイルへの書き込みは専用スレッドがまとめて行う。
+    既存のログは上書きしない (path が既にあれば FileExistsError)。
+    """
+
+    def __init__(self, path, flush_interval=0.2):
+        self.path = path
+        self.records = 0
+        self.dropped = 0
+        self._queue = deque()
+        self._flush_interval = flush_interval
+        self._start_ns = time.monotonic_ns()
+        self._next_index_ns = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._log = open(path, "xb")
+        try:
+            self._index = open(index_path(path), "wb")
+        except OSError:
+            self._log.close()
+            raise
+        self._log.write(LOG_HEADER.pack(LOG_MAGIC, time.time()))
+        self._index.write(INDEX_MAGIC)
+        self._offset = LOG_HEADER.size
+
+        self._wake = threading.Event()
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._run, name="match-log", daemon=True)
+        self._thread.start()
+
+    def record(self, byte_data):
+        """送信したデータグラムを1件記録する (どのスレッドからでも呼べる)"""
+        if len(byte_data) > 0xFFFF:
+            self.dropped += 1
+            return
+        # deque.append はスレッドセーフなのでロックを取らない
+        self._queue.append((time.monotonic_ns() - self._start_ns, byte_data))
+
+    def close(self):
+        """残りを書き出してファイルを閉じる"""
+        self._running = False
+        self._wake.set()
+        self._thread.join(timeout=2.0)
+        self._write_pending()
+        self._log.close()
+        self._index.close()
+
+    def _run(self):
+        """書き込みスレッド本体"""
+        while self._running:
+            self._wake.wait(self._flush_interval)
+            self._write_pending()
+
+    def _write_pending(self):
+        queue = self._queue
+        if not queue:
+            return
+        log_write = self._log.write
+        while queue:
+            t_ns, byte_data = queue.popleft()
+            if t_ns >= self._next_index_ns:
+                self._index.write(INDEX_ENTRY.pack(t_ns, self._offset))
+                self._next_index_ns = t_ns + INDEX_INTERVAL_NS
+            log_write(RECORD.pack(t_ns, len(byte_data)))
+            log_write(byte_data)
+            self._offset += RECORD.size + len(byte_data)
+            self.records += 1
+        self._log.flush()
+        self._index.flush()
+
+
+class MatchLogReader:
+    """ログファイルを mmap して読み出す"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < LOG_HEADER.size:
+                raise ValueError(f"Truncated match log: {path}")
+            self._log = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._index = None
+        self._index_count = 0
+        try:
+            magic, self.started_at = LOG_HEADER.unpack_from(self._log)
+            if magic != LOG_MAGIC:
+                raise ValueError(f"Not a match log: {path}")
+            self._open_index()
+        except BaseException:
+            self.close()
+            raise
+
+    def _open_index(self):
+        try:
+            with open(index_path(self.path), "rb") as f:
+                if os.fstat(f.fileno()).st_size > len(INDEX_MAGIC):
+                    self._index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            pass  # インデックスがなければ先頭から読む
+        if self._index is not None:
+            if self._index[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+                raise ValueError(f"Not a match log index: {index_path(self.path)}")
+            self._index_count = (len(self._index) - len(INDEX_MAGIC)) // INDEX_ENTRY.size
+
+    def close(self):
+        self._log.close()
+        if self._index is not None:
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def seek(self, t_ns):
+        """t_ns 以前で最後のインデックス位置 (レコードの読み始め位置) を返す"""
+        lo, hi = 0, self._index_count
+        offset = LOG_HEADER.size
+        # t_ns 以下の最後のエントリを二分探索する
+        while lo < hi:
+            mid = (lo + hi) // 2
+            entry_t_ns, entry_offset = INDEX_ENTRY.unpack_from(
+                self._index, len(INDEX_MAGIC) + mid * INDEX_ENTRY.size)
+            if entry_t_ns <= t_ns:
+                offset = entry_offset
+                lo = mid + 1
+            else:
+                hi = mid
+        return offset
+
+    def records(self, start_ns=0, end_ns=None):
+        """start_ns <= t_ns (< end_ns) の (t_ns, データグラム) を順に返す
+
+        インデックスで start_ns の直前まで飛んでから読むので、先頭から読み直さない。
+        """
+        log = self._log
+        offset = self.seek(start_ns)
+        size = len(log)
+        while offset + RECORD.size <= size:
+            t_ns, length = RECORD.unpack_from(log, offset)
+            offset += RECORD.size
+            if offset + length > size:
+                break  # 書き込み途中で終わったレコード
+            if end_ns is not None and t_ns >= end_ns:
+                break
+            if t_ns >= start_ns:
+                yield t_ns, log[offset:offset + length]
+            offset += length
+
+    def duration_ns(self):
+        """最後のレコードの時刻 (ログの長さ)"""
+        last = 0
+        for t_ns, _ in self.records(self._last_index_ns()):
+            last = t_ns
+        return last
+
+    def _last_index_ns(self):
+        if not self._index_count:
+            return 0
+        t_ns, _ = INDEX_ENTRY.unpack_from(
+            self._index, len(INDEX_MAGIC) + (self._index_count - 1) * INDEX_ENTRY.size)
+        return t_ns
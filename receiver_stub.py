@@ -0,0 +1,111 @@
+"""ロボット側受信プログラムの代わりにローカルで動かす受信スタブ
+
+ゲームコマンド (JSON / バイナリ) を受信して表示し、seq 付きのコマンドには ack を返す。
+周期配信されるゲーム状態は、変化したときだけ表示する。
+--telemetry-rate を付けると、ロボットのテレメトリを模擬してコントローラーに送る。
+1台のPCで確実な配送 (ack + 再送) やテレメトリ表示を試すために使う。
+
+    python3 receiver_stub.py --drop 0.3
+    python3 receiver_stub.py --telemetry-rate 100 --robots 6
+"""
+import argparse
+import math
+import random
+import socket
+import threading
+import time
+from collections import deque
+import config
+from codec import detect_codec, get_codec
+
+
+def send_telemetry(sock, addr, rate, robots, codec):
+    """ロボット robots 台が円を描いて動くテレメトリを rate [Hz] で送り続ける"""
+    period = 1.0 / rate
+    deadline = time.monotonic()
+    while True:
+        t = time.monotonic()
+        for i in range(robots):
+            team_color = ("yellow", "blue")[i % 2]
+            phase = t * 0.5 + i * 2 * math.pi / robots
+            data = {"type": "telemetry", "team_color": team_color, "robot_id": i // 2,
+                    "x": 2.0 * math.cos(phase), "y": 1.5 * math.sin(phase),
+                    "theta": phase % (2 * math.pi), "battery": 16.0 - (t % 60) / 30}
+            sock.sendto(codec.encode(data), addr)
+        deadline += period
+        time.sleep(max(deadline - time.monotonic(), 0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=config.LOCAL_IP)
+    parser.add_argument("--port", type=int,
+                        default=config.GAME_COMMAND_LISTEN_PORT)
+    parser.add_argument("--drop", type=float, default=0.0,
+                        help="受信パケットを捨てる確率 (パケット損失の模擬)")
+    parser.add_argument("--delay", type=float, default=0.0,
+                        help="ack を返すまでの遅延 [s]")
+    parser.add_argument("--telemetry-rate", type=float, default=0.0,
+                        help="模擬テレメトリの送信レート [Hz] (0 で送らない)")
+    parser.add_argument("--robots", type=int, default=4,
+                        help="模擬テレメトリのロボット台数")
+    parser.add_argument("--controller", default=config.LOCAL_IP,
+                        help="テレメトリの送信先 (コントローラーのIP)")
+    parser.add_argument("--wire-format", choices=("json", "binary"), default="json",
+                        help="模擬テレメトリのワイヤーフォーマット")
+    args = parser.parse_args()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((args.host, args.port))
+    print(f"Receiver stub listening on {args.host}:{args.port}")
+    if args.telemetry_rate > 0:
+        telemetry_addr = (args.controller, config.TELEMETRY_LISTEN_PORT)
+        telemetry_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        threading.Thread(target=send_telemetry, daemon=True,
+                         args=(telemetry_sock, telemetry_addr, args.telemetry_rate,
+                               args.robots, get_codec(args.wire_format))).start()
+        print(f"Sending telemetry of {args.robots} robots at "
+              f"{args.telemetry_rate:g} Hz to {telemetry_addr[0]}:{telemetry_addr[1]}")
+
+    # 連続送出や再送で重複した seq は1回だけ処理する
+    seen = deque(maxlen=256)
+    last_state = None
+    state_count = 0
+    try:
+        while True:
+            byte_data, addr = sock.recvfrom(2048)
+            if random.random() < args.drop:
+                print(f"Dropped: {byte_data!r}")
+                continue
+            # 受信した形式 (JSON / バイナリ) で ack を返す
+            codec = detect_codec(byte_data)
+            try:
+                data = codec.decode(byte_data)
+            except ValueError:
+                print(f"Invalid datagram from {addr}: {byte_data!r}")
+                continue
+
+            if data.get("type") == "game_state":
+                state_count += 1
+                if data != last_state:
+                    print(f"Game state #{state_count} from {addr}: {data}")
+                    last_state = data
+                continue
+
+            seq = data.get("seq")
+            if seq is None or seq not in seen:
+                print(f"Received from {addr}: {data}")
+                if seq is not None:
+                    seen.append(seq)
+            if seq is not None:
+                if args.delay:
+                    time.sleep(args.delay)
+                sock.sendto(codec.encode_ack(seq), addr)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
+
+
+if __name__ == "__main__":
+    main()
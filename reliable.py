@@ -0,0 +1,24 @@
+class RttEstimator:
+    """計測したRTTから再送タイムアウト(RTO)を求める (RFC 6298 と同じ平滑化)"""
+
+    def __init__(self, initial_rto, min_rto, max_rto):
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self.srtt = None  # 平滑化RTT [s]
+        self.rttvar = None  # RTTのばらつき [s]
+        self.rto = initial_rto
+
+    def sample(self, rtt):
+        """再送していないパケットのRTTを1件反映する"""
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self.rto = min(max(self.srtt + 4 * self.rttvar,
+                       self.min_rto), self.max_rto)
+
+    def timeout(self, tries):
+        """tries 回目の送信後に待つ時間 (再送ごとに倍にする)"""
+        return min(self.rto * (2 ** (tries - 1)), self.max_rto)
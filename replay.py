@@ -0,0 +1,123 @@
+"""試合ログ (.mlog) を再生して、記録したデータグラムをそのまま送信する
+
+ロボットのファームウェアを実際の試合の通信で回帰テストしたり、受信側の負荷試験に使う。
+
+    python3 replay.py logs/match-20260101-120000.mlog --target 127.0.0.1
+    python3 replay.py LOG --speed 4 --start 60 --end 120   # 60-120 秒を4倍速で
+    python3 replay.py LOG --speed 0                        # 待たずに全速で
+    python3 replay.py LOG --dump                           # 送らずに内容を表示
+"""
+import argparse
+import socket
+import time
+import config
+from codec import detect_codec
+from matchlog import MatchLogReader
+from targets import TargetRegistry
+
+
+def dump(reader, start_ns, end_ns):
+    for t_ns, byte_data in reader.records(start_ns, end_ns):
+        try:
+            data = detect_codec(byte_data).decode(byte_data)
+        except ValueError as e:
+            data = f"<undecodable: {e}>"
+        print(f"{t_ns / 1e9:12.6f} {len(byte_data):4d} B {data}")
+
+
+def replay(reader, addrs, start_ns, end_ns, speed, spin=config.SCRIPT_SPIN_MARGIN):
+    """ログの時刻を speed 倍に縮めて送信する (speed <= 0 なら待たない)
+
+    (送信数, 送信に失敗した数, 経過時間[s], 予定時刻からの最大の遅れ[s]) を返す。
+    送信先に届かなくても、残りのレコードの再生は続ける。
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+    sendto = sock.sendto
+    clock = time.monotonic
+    count = 0
+    failures = 0
+    max_lateness = 0.0
+    begin = clock()
+    base_ns = None
+    try:
+        for t_ns, byte_data in reader.records(start_ns, end_ns):
+            if speed > 0:
+                if base_ns is None:
+                    base_ns = t_ns
+                deadline = begin + (t_ns - base_ns) / 1e9 / speed
+                wait = deadline - clock() - spin
+                if wait > 0:
+                    time.sleep(wait)
+                while clock() < deadline:
+                    pass
+                lateness = clock() - deadline
+                if lateness > max_lateness:
+                    max_lateness = lateness
+            for addr in addrs:
+                try:
+                    sendto(byte_data, addr)
+                except OSError as e:
+                    failures += 1
+                    if failures == 1:  # 同じエラーで画面を埋めないように最初の1回だけ表示する
+                        print(f"Failed to send to {addr[0]}:{addr[1]}: {e}")
+            count += 1
+    finally:
+        sock.close()
+    return count, failures, clock() - begin, max_lateness
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("log", help="match log (.mlog) to replay")
+    parser.add_argument("--target", action="append",
+                        help="HOST[:PORT] to send to instead of config.TARGETS (repeatable)")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="playback speed (1 = real time, 0 = as fast as possible)")
+    parser.add_argument("--start", type=float, default=0.0,
+                        help="start time in the log [s]")
+    parser.add_argument("--end", type=float, help="end time in the log [s]")
+    parser.add_argument("--dump", action="store_true",
+                        help="print the records instead of sending them")
+    args = parser.parse_args()
+
+    start_ns = int(args.start * 1e9)
+    end_ns = None if args.end is None else int(args.end * 1e9)
+    try:
+        reader = MatchLogReader(args.log)
+    except (OSError, ValueError) as e:
+        parser.exit(2, f"error: {e}\n")
+
+    with reader:
+        if args.dump:
+            dump(reader, start_ns, end_ns)
+            return
+
+        try:
+            if args.target:
+                targets = TargetRegistry.from_specs(
+                    args.target, config.GAME_COMMAND_LISTEN_PORT)
+            else:
+                targets = TargetRegistry.from_config(config.TARGETS)
+        except ValueError as e:
+            parser.exit(2, f"error: {e}\n")
+        addrs = [target.addr for target in targets.targets()]
+
+        speed_text = "max speed" if args.speed <= 0 else f"{args.speed:g}x"
+        print(f"Replaying {args.log} ({reader.duration_ns() / 1e9:.1f} s) to "
+              f"{', '.join(f'{ip}:{port}' for ip, port in addrs)} at {speed_text}")
+        try:
+            count, failures, elapsed, max_lateness = replay(
+                reader, addrs, start_ns, end_ns, args.speed)
+        except KeyboardInterrupt:
+            print("Interrupted.")
+            return
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"Sent {count} datagrams in {elapsed:.3f} s ({rate:.0f}/s), "
+          f"max lateness {max_lateness * 1000:.3f} ms")
+    if failures:
+        print(f"{failures} sends failed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+import socket
+import struct
+import threading
+import time
+from collections import deque
+import config
+from reliable import RttEstimator
+from codec import get_codec, detect_codec
+from instrumentation import SendInstrumentation
+
+
+# 保留中のコマンドより先に送信するコマンド
+PRIORITY_COMMANDS = ("emergency_stop",)
+
+
+class _Entry:
+    """送信キューの1件 (place_ball の上書きや再送のために可変にしている)"""
+    __slots__ = ("data", "enqueued_at", "pressed_at", "seq", "tries", "sent_at",
+                 "deadline", "waiting", "done")
+
+    def __init__(self, data, enqueued_at, done=None, pressed_at=None):
+        self.data = data
+        self.enqueued_at = enqueued_at
+        self.pressed_at = pressed_at  # GUI の操作の時刻 (time.perf_counter)
+        self.done = done  # 最終結果の通知先 done(event, info)
+        self.seq = None  # ack を待つコマンドのみ採番する
+        self.tries = 0
+        self.sent_at = None
+        self.deadline = None
+        self.waiting = None  # ack を待っている送信先アドレスの set
+
+
+class CommandSender:
+    """UDPコマンドを送信する常駐ワーカー
+
+    送信用ソケットを所有し、1本のスレッドでキューの順にコマンドを送信する。
+    1件のコマンドは TargetRegistry の送信対象すべてに同じソケットから続けて送る。
+    emergency_stop は優先レーンに入り、保留中の他のコマンドより先に送信される。
+    place_ball はチームごとに未送信の古いコマンドを最新の位置で上書きする
+    (間に他のコマンドがあれば上書きしたものをキューの末尾に移す)。
+
+    reliable が有効な場合、config.RELIABLE_COMMANDS のコマンドには seq を付け、
+    unicast の送信先それぞれからの {"type": "ack", "seq": N} を待ち、
+    ack が来なければ計測RTTから求めたタイムアウトで未応答の送信先にだけ再送する。
+    """
+
+    def __init__(self, targets, on_event=None, reliable=config.RELIABLE_DELIVERY,
+                 wire_format=config.WIRE_FORMAT):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # ack 受信スレッドが停止を検知できるようにタイムアウトを付ける
+        self.sock.settimeout(0.2)
+        # 停止時に自分宛てのデータグラムで ack 受信スレッドを起こせるようにポートを決めておく
+        self.sock.bind(("", 0))
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL,
+                             config.MULTICAST_TTL)
+        self.targets = targets  # TargetRegistry
+        # on_event(event, data, info) は送信スレッド/ack受信スレッドから呼ばれる
+        # event: "sent" (info=キュー投入から送信までの秒数) / "failed" (info=例外)
+        #        "acked" (info=RTT秒) / "timeout" (info=送信回数)
+        self.on_event = on_event
+        self.reliable = reliable
+        self.codec = get_codec(wire_format)  # 送信に使うワイヤーフォーマット
+        self.match_log = None  # 送信したデータグラムを記録する MatchLogWriter
+        # 送信経路の区間ごとの所要時間 (無効なら None)
+        self.instrumentation = SendInstrumentation() if config.SEND_INSTRUMENTATION else None
+        self.rtt = RttEstimator(
+            config.RTO_INITIAL, config.RTO_MIN, config.RTO_MAX)
+
+        self._cond = threading.Condition()
+        self._urgent = deque()  # 優先レーン
+        self._normal = deque()  # 通常レーン
+        self._pending_place = {}  # team_color -> 未送信の place_ball エントリ
+        self._unacked = {}  # seq -> ack 待ちのエントリ
+        self._state = None  # 未送信の最新のゲーム状態 (最も低い優先度で送る)
+        self._next_seq = 1
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._run, name="udp-sender", daemon=True)
+        self._thread.start()
+        self._ack_thread = threading.Thread(
+            target=self._receive_acks, name="udp-ack", daemon=True)
+        self._ack_thread.start()
+
+    def submit(self, data, done=None, pressed_at=None):
+        """コマンドを送信キューに入れる (どのスレッドからでも呼べる)
+
+        done(event, info) を渡すと、そのコマンドの最終結果が1回だけ通知される。
+        event は on_event と同じもの ("sent" は ack を待たないコマンドのみ) に加えて、
+        新しい place_ball に上書きされた場合の "superseded"、
+        送信前に停止した場合の "cancelled" がある。
+        pressed_at (time.perf_counter) を渡すと、そこからの時間も計測に記録する。
+        """
+        now = time.perf_counter()
+        command = data.get("command")
+        superseded = None
+        with self._cond:
+            if not self._running:
+                return False
+            if command in PRIORITY_COMMANDS:
+                self._urgent.append(_Entry(data, now, done, pressed_at))
+            elif command == "place_ball":
+                team_color = data.get("team_color")
+                entry = self._pending_place.get(team_color)
+                if entry is not None:
+                    # 未送信の古い位置は捨てて最新の値に置き換える。間に他のコマンドが
+                    # 入っていれば、送信順が submit の順 (GameState に反映した順) と
+                    # 変わらないようにキューの末尾に移す
+                    superseded = entry.done
+                    entry.data = data
+                    entry.enqueued_at = now
+                    entry.pressed_at = pressed_at
+                    entry.done = done
+                    if self._normal[-1] is not entry:
+                        self._normal.remove(entry)
+                        self._normal.append(entry)
+                else:
+                    entry = _Entry(data, now, done, pressed_at)
+                    self._pending_place[team_color] = entry
+                    self._normal.append(entry)
+            else:
+                self._normal.append(_Entry(data, now, done, pressed_at))
+            self._cond.notify()
+        if superseded is not None:
+            superseded("superseded", None)
+        return True
+
+    def submit_state(self, data):
+        """周期配信するゲーム状態を送信キューに入れる
+
+        未送信の古い状態は最新のもので置き換え、コマンドがすべて送れてから送る。
+        送信結果は on_event に通知しない (送信先ごとの統計にだけ残る)。
+        """
+        with self._cond:
+            if not self._running:
+                return False
+            self._state = _Entry(data, time.perf_counter())
+            self._cond.notify()
+        return True
+
+    def close(self):
+        """ワーカーを停止してソケットを閉じる"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join(timeout=1.0)
+        try:
+            self.sock.sendto(b"", ("127.0.0.1", self.sock.getsockname()[1]))
+        except OSError:
+            pass  # 起こせなくてもタイムアウトで止まる
+        self._ack_thread.join(timeout=1.0)
+        self.sock.close()
+        # 結果を待っている呼び出し元が止まらないように、残りを取り消す
+        with self._cond:
+            remaining = list(self._urgent) + list(self._normal) + \
+                list(self._unacked.values())
+            self._urgent.clear()
+            self._normal.clear()
+            self._pending_place.clear()
+            self._unacked.clear()
+        for entry in remaining:
+            if entry.done is not None:
+                entry.done("cancelled", None)
+
+    def _next_work(self):
+        """次の仕事 ("send" / "retransmit" / "timeout" / "state", エントリ) を取り出す
+
+        停止時は None を返す。再送期限の来たエントリを最優先で返す。
+        """
+        with self._cond:
+            while self._running:
+                now = time.perf_counter()
+                earliest = None
+                for entry in self._unacked.values():
+                    if entry.deadline <= now:
+                        if entry.tries >= config.RETRANSMIT_MAX_TRIES:
+                            del self._unacked[entry.seq]
+                            return "timeout", entry
+                        return "retransmit", entry
+                    if earliest is None or entry.deadline < earliest:
+                        earliest = entry.deadline
+
+                if self._urgent:
+                    return "send", self._urgent.popleft()
+                if self._normal:
+                    entry = self._normal.popleft()
+                    if entry.data.get("command") == "place_ball":
+                        team_color = entry.data.get("team_color")
+                        if self._pending_place.get(team_color) is entry:
+                            del self._pending_place[team_color]
+                    return "send", entry
+                if self._state is not None:
+                    entry, self._state = self._state, None
+                    return "state", entry
+
+                self._cond.wait(None if earliest is None else earliest - now)
+            return None
+
+    def _run(self):
+        """送信スレッド本体"""
+        while True:
+            work = self._next_work()
+            if work is None:
+                return
+            kind, entry = work
+            dequeued_at = time.perf_counter()
+            try:
+                if kind == "timeout":
+                    print(f"No ack for {entry.data} from {sorted(entry.waiting)} "
+                          f"after {entry.tries} tries")
+                    self._notify("timeout", entry, entry.tries)
+                elif kind == "state":
+                    self._transmit_state(entry)
+                else:
+                    self._transmit(entry, kind == "retransmit", dequeued_at)
+            except Exception as e:
+                # 1件の想定外のエラー (通知先の例外など) で送信スレッドを止めない
+                print(f"Unexpected error in sender ({kind} {entry.data}): {e!r}")
+
+    def _transmit(self, entry, is_retransmit, dequeued_at):
+        """1件のコマンドを送信して結果を通知する"""
+        data = entry.data
+        try:
+            targets = self.targets.active_targets()
+            if is_retransmit:
+                with self._cond:
+                    targets = [target for target in targets
+                               if target.addr in entry.waiting]
+            elif not targets:
+                raise socket.error("No targets selected")
+            elif self.reliable and data.get("command") in config.RELIABLE_COMMANDS:
+                waiting = {target.addr for target in targets if target.acks}
+                if waiting:
+                    with self._cond:
+                        entry.seq = self._next_seq
+                        entry.waiting = waiting
+                        self._next_seq = (self._next_seq + 1) & 0xFFFFFFFF or 1
+            byte_data = self.codec.encode(data, entry.seq)
+            encoded_at = time.perf_counter()
+
+            copies = 1
+            if data.get("command") == "emergency_stop":
+                # 1パケットの損失で止まり損ねないように、ack の有無や送信先の種類によらず
+                # 同じデータグラムを連続送出する (何回受け取っても結果は同じ)
+                copies = max(config.EMERGENCY_STOP_BURST, 1)
+            if entry.seq is not None:
+                # sendto より前に ack 待ちに登録する。送信直後に届いた ack を取りこぼさず、
+                # 再送への ack が tries == 1 の送信時刻で計測されないようにする (Karn のルール)。
+                # 全送信先に失敗した場合も、ack を待つコマンドは再送の対象に残す
+                with self._cond:
+                    if is_retransmit and entry.seq not in self._unacked:
+                        return  # 再送の直前に ack が届いた
+                    entry.tries += 1
+                    entry.sent_at = time.perf_counter()
+                    entry.deadline = entry.sent_at + self.rtt.timeout(entry.tries)
+                    self._unacked[entry.seq] = entry
+            failures = self._send_to(targets, byte_data, copies)
+            sent_at = time.perf_counter()
+            if self.match_log is not None:
+                self.match_log.record(byte_data)
+
+            if targets and failures == len(targets):
+                raise targets[0].last_error
+            if is_retransmit:
+                print(f"Resent: {data} seq={entry.seq} (try {entry.tries})")
+                return
+            latency = sent_at - entry.enqueued_at
+            if self.instrumentation is not None:
+                command = data.get("command", "unknown")
+                record = self.instrumentation.record
+                record(command, "queue", dequeued_at - entry.enqueued_at)
+                record(command, "encode", encoded_at - dequeued_at)
+                record(command, "send", sent_at - encoded_at)
+                record(command, "total", latency)
+                if entry.pressed_at is not None:
+                    record(command, "callback", entry.enqueued_at - entry.pressed_at)
+                    record(command, "wire", sent_at - entry.pressed_at)
+            seq_text = "" if entry.seq is None else f" seq={entry.seq}"
+            print(f"Sent: {data}{seq_text} to {len(targets) - failures}/{len(targets)} "
+                  f"targets ({latency * 1000:.3f} ms in queue)")
+            self._notify("sent", entry, latency, final=entry.seq is None)
+        except socket.error as e:
+            print(f"Failed to send command: {e}")
+            self._notify("failed", entry, e, final=entry.seq is None)
+        except (ValueError, struct.error) as e:  # エンコードエラー
+            print(f"Error encoding data: {e}")
+            self._notify("failed", entry, e)
+        except Exception as e:  # その他の予期せぬエラー
+            print(f"An unexpected error occurred during send: {e}")
+            self._notify("failed", entry, e, final=entry.seq is None)
+
+    def _transmit_state(self, entry):
+        """ゲーム状態を送信する (周期配信なので表示・通知はしない)"""
+        try:
+            byte_data = self.codec.encode(entry.data)
+        except (ValueError, struct.error, KeyError) as e:
+            print(f"Error encoding game state: {e}")
+            return
+        self._send_to(self.targets.active_targets(), byte_data, quiet=True)
+        if self.match_log is not None:
+            self.match_log.record(byte_data)
+
+    def _send_to(self, targets, byte_data, copies=1, quiet=False):
+        """同じデータグラムを全送信先に copies 個ずつ続けて送り、失敗した送信先の数を返す"""
+        sendto = self.sock.sendto
+        clock = time.perf_counter
+        failures = 0
+        for target in targets:
+            start = clock()
+            try:
+                for _ in range(copies):
+                    sendto(byte_data, target.addr)
+            except OSError as e:
+                target.record(clock() - start, e)
+                failures += 1
+                if not quiet:
+                    print(f"Failed to send to {target.name} {target.addr}: {e}")
+            else:
+                target.record(clock() - start)
+        return failures
+
+    def _receive_acks(self):
+        """ack 受信スレッド本体"""
+        while self._running:
+            try:
+                byte_data, addr = self.sock.recvfrom(2048)
+            except socket.timeout:
+                continue
+            except OSError:
+                return  # ソケットが閉じられた
+            received_at = time.perf_counter()
+            try:
+                message = detect_codec(byte_data).decode(byte_data)
+                if message.get("type") != "ack":
+                    continue
+                seq = message["seq"]
+            except (ValueError, KeyError, AttributeError):
+                continue
+            if type(seq) is not int:
+                continue  # JSON の ack は seq に何でも入りうる
+
+            with self._cond:
+                entry = self._unacked.get(seq)
+                if entry is None or addr not in entry.waiting:
+                    continue  # 重複した ack や期限切れ
+                entry.waiting.discard(addr)
+                rtt = received_at - entry.sent_at
+                # 再送したパケットの ack はどの送信に対するものか分からないので使わない
+                if entry.tries == 1:
+                    self.rtt.sample(rtt)
+                if entry.waiting:
+                    continue  # 他の送信先の ack を待つ
+                del self._unacked[seq]
+                self._cond.notify()
+            self._notify("acked", entry, rtt)
+
+    def _notify(self, event, entry, info, final=True):
+        """on_event に通知し、最終結果ならエントリの done にも通知する"""
+        if self.on_event is not None:
+            self.on_event(event, entry.data, info)
+        if final and entry.done is not None:
+            entry.done(event, info)
@@ -0,0 +1,140 @@
+import ipaddress
+import socket
+import threading
+
+
+ALL_GROUP = "all"  # 全送信先を表すグループ名
+
+
+class Target:
+    """コマンドの送信先1つと、その送信統計"""
+
+    def __init__(self, name, host, port, groups=(), broadcast=False):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.groups = tuple(groups)
+        try:
+            # ack の送信元アドレスと照合できるように数値のIPにしておく
+            ip = socket.gethostbyname(host)
+        except socket.gaierror as e:
+            raise ValueError(f"Cannot resolve host {host}: {e}")
+        self.addr = (ip, port)
+        if ipaddress.ip_address(ip).is_multicast:
+            self.kind = "multicast"
+        elif broadcast or ip == "255.255.255.255":
+            # サブネットによってブロードキャストアドレスは異なるので、アドレスの末尾では判定しない
+            self.kind = "broadcast"
+        else:
+            self.kind = "unicast"
+
+        # 送信統計 (送信スレッドだけが更新する)
+        self.sent = 0
+        self.failures = 0
+        self.last_send_time = None  # 直近の sendto にかかった時間 [s]
+        self.max_send_time = 0.0
+        self.last_error = None
+
+    @property
+    def acks(self):
+        """ack を返せる送信先か (broadcast/multicast は送信元を特定できないので待たない)"""
+        return self.kind == "unicast"
+
+    def record(self, send_time, error=None):
+        """1回の送信結果を記録する"""
+        self.last_send_time = send_time
+        if send_time > self.max_send_time:
+            self.max_send_time = send_time
+        if error is None:
+            self.sent += 1
+        else:
+            self.failures += 1
+            self.last_error = error
+
+
+class TargetRegistry:
+    """送信先の一覧と、フィールド/チームごとの名前付きグループ
+
+    active_group に含まれる送信先にだけコマンドを送る。
+    GUIスレッドから変更し、送信スレッドは active_targets() のスナップショットを使う。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._targets = {}  # name -> Target (追加順)
+        self.active_group = ALL_GROUP
+        self._active = ()
+
+    @classmethod
+    def from_config(cls, entries):
+        """config.TARGETS 形式の dict のリストから作る"""
+        registry = cls()
+        for entry in entries:
+            registry.add(entry["name"], entry["host"], entry["port"],
+                         entry.get("groups", ()), entry.get("broadcast", False))
+        return registry
+
+    @classmethod
+    def from_specs(cls, specs, default_port):
+        """コマンドラインの "HOST[:PORT]" のリストから作る"""
+        registry = cls()
+        for spec in specs:
+            registry.add_spec(spec, default_port)
+        return registry
+
+    def add(self, name, host, port, groups=(), broadcast=False):
+        """送信先を追加する (同じ名前があれば置き換える)
+
+        別の名前で同じアドレスが登録済みなら、同じ受信側に2回ずつ送ることになるので ValueError。
+        """
+        target = Target(name, host, port, groups, broadcast)
+        with self._lock:
+            for other in self._targets.values():
+                if other.addr == target.addr and other.name != name:
+                    raise ValueError(
+                        f"{target.addr[0]}:{target.port} is already registered as {other.name}")
+            self._targets[name] = target
+            self._update_active()
+        return target
+
+    def add_spec(self, spec, default_port):
+        """"HOST[:PORT]" 形式の送信先を "HOST:PORT" という名前で追加する (不正なら ValueError)"""
+        host, _, port_str = spec.strip().partition(":")
+        if not host:
+            raise ValueError(f"Invalid target: {spec!r}")
+        port = int(port_str) if port_str else default_port
+        if not 0 < port < 65536:
+            raise ValueError(f"Invalid port: {port}")
+        return self.add(f"{host}:{port}", host, port)
+
+    def remove(self, name):
+        with self._lock:
+            self._targets.pop(name, None)
+            self._update_active()
+
+    def select(self, group):
+        """送信するグループを切り替える"""
+        with self._lock:
+            self.active_group = group
+            self._update_active()
+
+    def groups(self):
+        """選択できるグループ名の一覧"""
+        with self._lock:
+            names = {group for target in self._targets.values()
+                     for group in target.groups}
+        return [ALL_GROUP] + sorted(names)
+
+    def targets(self):
+        """全送信先 (追加順)"""
+        with self._lock:
+            return list(self._targets.values())
+
+    def active_targets(self):
+        """送信対象のスナップショット (ロックを取らずに読める tuple)"""
+        return self._active
+
+    def _update_active(self):
+        self._active = tuple(
+            target for target in self._targets.values()
+            if self.active_group == ALL_GROUP or self.active_group in target.groups)
@@ -0,0 +1,147 @@
+import math
+import socket
+import threading
+import time
+from array import array
+from codec import detect_codec
+
+
+class RingBuffer:
+    """ロボット1台分の直近 N 件のテレメトリ
+
+    受信のたびにオブジェクトを作らないように、項目ごとの配列を最初に確保して使い回す。
+    """
+    FIELDS = ("t", "x", "y", "theta", "battery")
+
+    def __init__(self, size):
+        self.size = size
+        self.count = 0  # これまでに追加した件数
+        self._columns = {name: array('d', [math.nan]) * size for name in self.FIELDS}
+
+    def append(self, t, x, y, theta, battery):
+        i = self.count % self.size
+        columns = self._columns
+        columns["t"][i] = t
+        columns["x"][i] = x
+        columns["y"][i] = y
+        columns["theta"][i] = theta
+        columns["battery"][i] = battery
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def latest(self):
+        """最新の1件 (dict)、まだなければ None"""
+        if not self.count:
+            return None
+        i = (self.count - 1) % self.size
+        return {name: column[i] for name, column in self._columns.items()}
+
+    def column(self, name):
+        """1項目の値を古い順に並べたリスト"""
+        column = self._columns[name]
+        if self.count <= self.size:
+            return column[:self.count].tolist()
+        start = self.count % self.size
+        return column[start:].tolist() + column[:start].tolist()
+
+    def rate(self, window=1.0):
+        """直近 window 秒の受信レート [Hz]"""
+        times = self.column("t")
+        if len(times) < 2:
+            return 0.0
+        newest = times[-1]
+        recent = [t for t in times if newest - t <= window]
+        span = newest - recent[0]
+        return (len(recent) - 1) / span if span > 0 else 0.0
+
+
+class TelemetryReceiver:
+    """ロボットから送られる状態・テレメトリを受信するスレッド
+
+    {"type": "telemetry", "team_color", "robot_id", "x", "y", "theta", "battery"}
+    (JSON / バイナリ) を受信し、ロボットごとの RingBuffer に入れる。
+    on_update() は表示側が最後に clear_dirty() を呼んでから最初の受信時にだけ呼ばれるので、
+    受信レートが高くても通知は表示の更新1回につき1回に抑えられる。
+    """
+
+    def __init__(self, port, host="", history=256, on_update=None):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.settimeout(0.2)
+        self.sock.bind((host, port))
+        self.history = history
+        self.on_update = on_update  # 受信スレッドから呼ばれる
+        self.robots = {}  # (team_color, robot_id) -> RingBuffer
+        self.received = 0
+        self.invalid = 0
+        self._dirty = False
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._run, name="telemetry-recv", daemon=True)
+        self._thread.start()
+
+    @property
+    def port(self):
+        return self.sock.getsockname()[1]
+
+    def clear_dirty(self):
+        """表示側が最新の状態を読み込む直前に呼ぶ"""
+        self._dirty = False
+
+    def close(self):
+        self._running = False
+        try:
+            # 受信待ちのスレッドを自分宛てのデータグラムで起こす
+            self.sock.sendto(b"", ("127.0.0.1", self.port))
+        except OSError:
+            pass
+        self._thread.join(timeout=1.0)
+        self.sock.close()
+
+    def _run(self):
+        """受信スレッド本体"""
+        clock = time.monotonic
+        while self._running:
+            try:
+                byte_data, _ = self.sock.recvfrom(2048)
+            except socket.timeout:
+                continue
+            except OSError:
+                return  # ソケットが閉じられた
+            if not byte_data:
+                continue
+            try:
+                data = detect_codec(byte_data).decode(byte_data)
+                if data.get("type") != "telemetry":
+                    continue
+                team_color = data["team_color"]
+                if not isinstance(team_color, str):
+                    raise TypeError(f"Invalid team color: {team_color!r}")
+                key = (team_color, int(data["robot_id"]))
+                x, y = float(data["x"]), float(data["y"])
+                # theta の省略は向き不明 (nan) とする
+                theta = math.nan if data.get("theta") is None else float(data["theta"])
+                # JSON の Infinity/NaN やバイナリの inf は表示の計算で例外になるので捨てる
+                if not (math.isfinite(x) and math.isfinite(y)) or \
+                        (data.get("theta") is not None and not math.isfinite(theta)):
+                    raise ValueError("Non-finite position")
+                sample = (clock(), x, y, theta, float(data.get("battery", math.nan)))
+            except (ValueError, KeyError, TypeError, AttributeError):
+                self.invalid += 1
+                continue
+
+            buffer = self.robots.get(key)
+            if buffer is None:
+                # GUI スレッドが空のバッファを読まないように、1件入れてから公開する
+                buffer = RingBuffer(self.history)
+                buffer.append(*sample)
+                self.robots[key] = buffer
+            else:
+                buffer.append(*sample)
+            self.received += 1
+
+            if not self._dirty:
+                self._dirty = True
+                if self.on_update is not None:
+                    self.on_update()
@@ -0,0 +1,87 @@
+"""ワイヤーフォーマット (JSON / バイナリ) のエンコードとデコード"""
+import unittest
+from codec import CODECS, FIXED_COMMANDS, HEADER, PROTOCOL_VERSION, TYPE_CODES, \
+    detect_codec, get_codec
+
+# float32 で正確に表せる値を使い、往復で値が変わらないようにする
+MESSAGES = [
+    *FIXED_COMMANDS.values(),
+    {"type": "game_command", "command": "place_ball", "team_color": "yellow",
+     "x": 1.5, "y": -0.25},
+    {"type": "game_command", "command": "place_ball", "team_color": "blue",
+     "x": -4.5, "y": 3.0},
+    {"type": "game_state", "state": "running", "counter": 7,
+     "ball_placement": {"team_color": "blue", "x": 0.5, "y": -1.0}},
+    {"type": "game_state", "state": "emergency_stop", "counter": 0xFFFFFFFF,
+     "ball_placement": None},
+    {"type": "telemetry", "team_color": "yellow", "robot_id": 3,
+     "x": 1.25, "y": -2.0, "theta": 0.5, "battery": 15.5},
+]
+
+
+class CodecRoundTripTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        for codec in CODECS.values():
+            for data in MESSAGES:
+                with self.subTest(codec=codec.name, data=data):
+                    byte_data = codec.encode(data)
+                    self.assertIs(detect_codec(byte_data), codec)
+                    self.assertEqual(codec.decode(byte_data), data)
+
+    def test_round_trip_with_seq(self):
+        for codec in CODECS.values():
+            for name in ("emergency_stop", "stop_game"):
+                with self.subTest(codec=codec.name, command=name):
+                    byte_data = codec.encode(FIXED_COMMANDS[name], seq=42)
+                    self.assertEqual(codec.decode(byte_data),
+                                     dict(FIXED_COMMANDS[name], seq=42))
+
+    def test_ack(self):
+        for codec in CODECS.values():
+            with self.subTest(codec=codec.name):
+                self.assertEqual(codec.decode(codec.encode_ack(0x12345678)),
+                                 {"type": "ack", "seq": 0x12345678})
+
+    def test_unknown_wire_format(self):
+        with self.assertRaises(ValueError):
+            get_codec("xml")
+
+
+class BinaryCodecErrorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.codec = get_codec("binary")
+
+    def test_truncated_datagram(self):
+        for data in MESSAGES:
+            byte_data = self.codec.encode(data)
+            for length in (0, HEADER.size - 1) + \
+                    ((len(byte_data) - 1,) if len(byte_data) > HEADER.size else ()):
+                with self.subTest(data=data, length=length):
+                    with self.assertRaises(ValueError):
+                        self.codec.decode(byte_data[:length])
+
+    def test_unknown_type_and_version(self):
+        with self.assertRaises(ValueError):
+            self.codec.decode(HEADER.pack(PROTOCOL_VERSION, 0x7F, 0))
+        with self.assertRaises(ValueError):
+            self.codec.decode(HEADER.pack(PROTOCOL_VERSION + 1, TYPE_CODES["start_game"], 0))
+
+    def test_float32_overflow_raises_value_error(self):
+        messages = [
+            {"type": "game_command", "command": "place_ball", "team_color": "yellow",
+             "x": 1e40, "y": 0.0},
+            {"type": "game_state", "state": "running", "counter": 1,
+             "ball_placement": {"team_color": "blue", "x": 0.0, "y": -1e40}},
+            {"type": "telemetry", "team_color": "yellow", "robot_id": 0,
+             "x": 0.0, "y": 0.0, "theta": 1e40, "battery": 0.0},
+        ]
+        for data in messages:
+            with self.subTest(data=data):
+                with self.assertRaises(ValueError):
+                    self.codec.encode(data)
+
+
+if __name__ == "__main__":
+    unittest.main()
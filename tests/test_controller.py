@@ -0,0 +1,50 @@
+"""GameController のコマンドの検証と状態への反映"""
+import os
+import tempfile
+import threading
+import unittest
+from controller import GameController
+from targets import TargetRegistry
+
+
+class SendTest(unittest.TestCase):
+
+    def setUp(self):
+        # 送信先なしで送信スレッドだけ動かす
+        self.controller = GameController(TargetRegistry(), state_rate_hz=0)
+        self.addCleanup(self.controller.close)
+
+    def test_place_ball_is_normalized_before_applying(self):
+        self.controller.send({"type": "game_command", "command": "place_ball",
+                              "team_color": "yellow", "x": "1", "y": 2})
+        placement = self.controller.state.message()["ball_placement"]
+        self.assertEqual(placement, {"team_color": "yellow", "x": 1.0, "y": 2.0})
+        self.assertIs(type(placement["x"]), float)
+
+    def test_invalid_place_ball_is_not_applied(self):
+        for x in ("abc", None, 1e40, float("inf")):
+            with self.subTest(x=x):
+                with self.assertRaises(ValueError):
+                    self.controller.send({"type": "game_command", "command": "place_ball",
+                                          "team_color": "yellow", "x": x, "y": 0.0})
+        self.assertEqual(self.controller.state.message()["counter"], 0)
+        self.assertIsNone(self.controller.state.message()["ball_placement"])
+
+
+class MatchLogTest(unittest.TestCase):
+
+    def test_unwritable_log_does_not_start_sender(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        blocker = os.path.join(directory.name, "file")
+        open(blocker, "w").close()
+        before = threading.active_count()
+        with self.assertRaises(OSError):
+            # ディレクトリの代わりにファイルがあるのでログを作れない
+            GameController(TargetRegistry(), state_rate_hz=0,
+                           match_log=os.path.join(blocker, "match.mlog"))
+        self.assertEqual(threading.active_count(), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+"""試合ログの書き込みと読み出し"""
+import os
+import tempfile
+import unittest
+from matchlog import LOG_HEADER, LOG_MAGIC, MatchLogReader, MatchLogWriter, index_path, \
+    new_log_path
+
+
+class MatchLogTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.path = os.path.join(directory.name, "match.mlog")
+
+    def test_round_trip(self):
+        writer = MatchLogWriter(self.path)
+        for i in range(10):
+            writer.record(bytes([i]) * (i + 1))
+        writer.close()
+        with MatchLogReader(self.path) as reader:
+            records = [byte_data for _, byte_data in reader.records()]
+        self.assertEqual(records, [bytes([i]) * (i + 1) for i in range(10)])
+
+    def test_truncated_header_raises_value_error(self):
+        for content in (b"", LOG_MAGIC):
+            with open(self.path, "wb") as f:
+                f.write(content)
+            with self.assertRaises(ValueError):
+                MatchLogReader(self.path)
+
+    def test_bad_index_raises_value_error(self):
+        with open(self.path, "wb") as f:
+            f.write(LOG_HEADER.pack(LOG_MAGIC, 0.0))
+        with open(index_path(self.path), "wb") as f:
+            f.write(b"NOTINDEX" + bytes(16))
+        with self.assertRaises(ValueError):
+            MatchLogReader(self.path)
+
+    def test_existing_log_is_not_overwritten(self):
+        MatchLogWriter(self.path).close()
+        with self.assertRaises(FileExistsError):
+            MatchLogWriter(self.path)
+
+    def test_new_log_path_is_unique(self):
+        paths = []
+        for _ in range(3):
+            paths.append(new_log_path(self.directory))
+            MatchLogWriter(paths[-1]).close()
+        self.assertEqual(len(set(paths)), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,217 @@
+"""CommandSender の送信順と ack / 再送の状態遷移をループバックで確かめる"""
+import socket
+import threading
+import time
+import unittest
+from collections import Counter
+import config
+from codec import detect_codec
+from sender import CommandSender
+from targets import TargetRegistry
+
+
+class AckingReceiver:
+    """受信した seq を数えて ack を返すループバックの受信側
+
+    ignore_first が真なら、各 seq の最初の1回には ack を返さない (再送させる)。
+    """
+
+    def __init__(self, ignore_first=False):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(0.1)
+        self.ignore_first = ignore_first
+        self.received = Counter()  # seq -> 受信回数
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def addr(self):
+        return self.sock.getsockname()
+
+    def close(self):
+        self._running = False
+        self._thread.join(timeout=1.0)
+        self.sock.close()
+
+    def _run(self):
+        while self._running:
+            try:
+                byte_data, addr = self.sock.recvfrom(2048)
+            except socket.timeout:
+                continue
+            codec = detect_codec(byte_data)
+            seq = codec.decode(byte_data).get("seq")
+            if seq is None:
+                continue
+            self.received[seq] += 1
+            if self.ignore_first and self.received[seq] == 1:
+                continue
+            self.sock.sendto(codec.encode_ack(seq), addr)
+
+
+def place_ball(team_color, x):
+    return {"type": "game_command", "command": "place_ball",
+            "team_color": team_color, "x": x, "y": 0.0}
+
+
+def command(name):
+    return {"type": "game_command", "command": name}
+
+
+class QueueOrderTest(unittest.TestCase):
+    """送信スレッドを止めた状態でキューに入れ、送信される順を確かめる"""
+
+    def setUp(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(self.sock.close)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(2.0)
+        targets = TargetRegistry()
+        targets.add("stub", *self.sock.getsockname())
+        self.sender = CommandSender(targets, wire_format="json")
+        self.addCleanup(self.sender.close)
+        self.results = []
+
+    def submit_all(self, items):
+        # Condition のロックは再入できるので、持ったまま submit すると送信スレッドが取り出せない
+        with self.sender._cond:
+            for data in items:
+                self.sender.submit(data, lambda event, info, data=data:
+                                   self.results.append((data, event)))
+
+    def receive(self, count):
+        received = []
+        for _ in range(count):
+            byte_data = self.sock.recv(2048)
+            data = detect_codec(byte_data).decode(byte_data)
+            received.append((data["command"], data.get("x")))
+        return received
+
+    def test_emergency_stop_jumps_ahead_of_backlog(self):
+        self.submit_all([command("start_game"), place_ball("yellow", 1.0),
+                         command("stop_game"), command("emergency_stop")])
+        burst = config.EMERGENCY_STOP_BURST
+        self.assertEqual(self.receive(burst + 3),
+                         [("emergency_stop", None)] * burst +
+                         [("start_game", None), ("place_ball", 1.0), ("stop_game", None)])
+
+    def test_place_ball_is_coalesced_per_team(self):
+        old = place_ball("yellow", 1.0)
+        self.submit_all([old, place_ball("blue", 2.0), place_ball("yellow", 3.0)])
+        self.assertEqual(self.receive(2), [("place_ball", 2.0), ("place_ball", 3.0)])
+        self.sender.close()
+        self.assertIn((old, "superseded"), self.results)
+        self.assertEqual(sorted(event for _, event in self.results),
+                         ["sent", "sent", "superseded"])
+
+    def test_coalesced_place_ball_keeps_submit_order(self):
+        self.submit_all([place_ball("yellow", 1.0), command("start_game"),
+                         place_ball("yellow", 2.0)])
+        self.assertEqual(self.receive(2), [("start_game", None), ("place_ball", 2.0)])
+
+
+class ReliableSendTest(unittest.TestCase):
+
+    def start(self, ignore_first=False):
+        self.receiver = AckingReceiver(ignore_first)
+        self.addCleanup(self.receiver.close)
+        targets = TargetRegistry()
+        targets.add("stub", *self.receiver.addr)
+        self.sender = CommandSender(targets, reliable=True, wire_format="json")
+        self.addCleanup(self.sender.close)
+
+    def send(self, data):
+        """1件送って最終結果 (event, info) を返す"""
+        finished = threading.Event()
+        result = []
+
+        def done(event, info):
+            result.append((event, info))
+            finished.set()
+
+        self.assertTrue(self.sender.submit(data, done))
+        self.assertTrue(finished.wait(5.0), "no result")
+        return result[0]
+
+    def test_lossless_loopback_sends_each_command_once(self):
+        self.start()
+        for _ in range(50):
+            event, rtt = self.send({"type": "game_command", "command": "stop_game"})
+            self.assertEqual(event, "acked")
+            self.assertGreater(rtt, 0)
+        self.assertEqual(len(self.receiver.received), 50)
+        self.assertEqual(set(self.receiver.received.values()), {1})
+        self.assertIsNotNone(self.sender.rtt.srtt)
+
+    def test_ack_to_retransmission_is_not_sampled(self):
+        self.start(ignore_first=True)
+        event, _ = self.send({"type": "game_command", "command": "stop_game"})
+        self.assertEqual(event, "acked")
+        self.assertEqual(list(self.receiver.received.values()), [2])
+        self.assertIsNone(self.sender.rtt.srtt)
+
+    def test_malformed_ack_does_not_stop_ack_thread(self):
+        self.start()
+        port = self.sender.sock.getsockname()[1]
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            for byte_data in (b'{"type": "ack", "seq": [1]}', b'{"type": "ack", "seq": 1.5}',
+                              b'{"type": "ack", "seq": true}', b'[]', b'\x01'):
+                sock.sendto(byte_data, ("127.0.0.1", port))
+        event, _ = self.send({"type": "game_command", "command": "stop_game"})
+        self.assertEqual(event, "acked")
+        self.assertTrue(self.sender._ack_thread.is_alive())
+
+
+class WorkerRobustnessTest(unittest.TestCase):
+
+    def test_bad_entries_do_not_stop_worker(self):
+        receiver = AckingReceiver()
+        self.addCleanup(receiver.close)
+        targets = TargetRegistry()
+        targets.add("stub", *receiver.addr)
+        sender = CommandSender(targets, wire_format="binary")
+        self.addCleanup(sender.close)
+
+        def raising_done(event, info):
+            raise RuntimeError("callback failed")
+
+        sender.submit_state({"type": "game_state", "state": "running", "counter": 1,
+                             "ball_placement": {"team_color": "blue", "x": 1e40, "y": 0.0}})
+        time.sleep(0.05)  # ゲーム状態はコマンドより後に送られるので、先に処理させる
+        sender.submit({"type": "game_command", "command": "start_game"}, raising_done)
+        finished = threading.Event()
+        sender.submit({"type": "game_command", "command": "emergency_stop"},
+                      lambda event, info: finished.set())
+        self.assertTrue(finished.wait(5.0))
+        self.assertTrue(sender._thread.is_alive())
+
+
+class EmergencyStopBurstTest(unittest.TestCase):
+
+    def receive_burst(self, reliable, broadcast):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(sock.close)
+        sock.bind(("127.0.0.1", 0))
+        sock.settimeout(0.5)
+        targets = TargetRegistry()
+        targets.add("robot", *sock.getsockname(), broadcast=broadcast)
+        sender = CommandSender(targets, reliable=reliable, wire_format="binary")
+        self.addCleanup(sender.close)
+
+        sender.submit({"type": "game_command", "command": "emergency_stop"})
+        received = [sock.recv(2048) for _ in range(config.EMERGENCY_STOP_BURST)]
+        self.assertEqual(len(set(received)), 1)
+        return detect_codec(received[0]).decode(received[0])
+
+    def test_broadcast_target_gets_burst_without_acks(self):
+        # ack を返せない送信先として扱われる (seq は付かない)
+        self.assertIsNone(self.receive_burst(reliable=True, broadcast=True).get("seq"))
+
+    def test_unicast_target_gets_burst_without_reliable_delivery(self):
+        self.assertIsNone(self.receive_burst(reliable=False, broadcast=False).get("seq"))
+
+
+if __name__ == "__main__":
+    unittest.main()
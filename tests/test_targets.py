@@ -0,0 +1,38 @@
+"""TargetRegistry の送信先の登録"""
+import unittest
+from targets import TargetRegistry
+
+
+class TargetRegistryTest(unittest.TestCase):
+
+    def test_same_address_under_another_name_is_rejected(self):
+        targets = TargetRegistry()
+        targets.add("local", "127.0.0.1", 50008)
+        with self.assertRaises(ValueError):
+            targets.add("127.0.0.1:50008", "127.0.0.1", 50008)
+        self.assertEqual([target.name for target in targets.targets()], ["local"])
+
+    def test_same_name_replaces_target(self):
+        targets = TargetRegistry()
+        targets.add("local", "127.0.0.1", 50008)
+        targets.add("local", "127.0.0.1", 50008, groups=("field1",))
+        self.assertEqual(targets.groups(), ["all", "field1"])
+
+    def test_kind(self):
+        targets = TargetRegistry()
+        self.assertEqual(targets.add("a", "192.168.0.255", 50008).kind, "unicast")
+        self.assertEqual(
+            targets.add("b", "192.168.0.255", 50009, broadcast=True).kind, "broadcast")
+        self.assertEqual(targets.add("c", "239.0.0.1", 50008).kind, "multicast")
+
+    def test_add_spec(self):
+        targets = TargetRegistry()
+        self.assertEqual(targets.add_spec("127.0.0.1", 50008).addr, ("127.0.0.1", 50008))
+        self.assertEqual(targets.add_spec("127.0.0.1:50010", 50008).name, "127.0.0.1:50010")
+        for spec in (":50008", "127.0.0.1:port", "127.0.0.1:70000"):
+            with self.assertRaises(ValueError):
+                targets.add_spec(spec, 50008)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+"""テレメトリのリングバッファと受信"""
+import math
+import socket
+import threading
+import unittest
+from codec import get_codec
+from telemetry import RingBuffer, TelemetryReceiver
+
+
+class RingBufferTest(unittest.TestCase):
+
+    def test_empty(self):
+        buffer = RingBuffer(4)
+        self.assertEqual(len(buffer), 0)
+        self.assertIsNone(buffer.latest())
+
+    def test_wraps_around(self):
+        buffer = RingBuffer(4)
+        for i in range(6):
+            buffer.append(float(i), i * 1.0, 0.0, 0.0, 16.0)
+        self.assertEqual(len(buffer), 4)
+        self.assertEqual(buffer.latest()["t"], 5.0)
+        self.assertEqual(buffer.latest()["x"], 5.0)
+
+
+def telemetry(**fields):
+    data = {"type": "telemetry", "team_color": "yellow", "robot_id": 1,
+            "x": 0.5, "y": -0.5, "theta": 0.25, "battery": 15.0}
+    data.update(fields)
+    return data
+
+
+class TelemetryReceiverTest(unittest.TestCase):
+
+    def setUp(self):
+        self.updated = threading.Event()
+        self.receiver = TelemetryReceiver(0, host="127.0.0.1", history=8,
+                                          on_update=self.updated.set)
+        self.addCleanup(self.receiver.close)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(self.sock.close)
+
+    def send(self, byte_data):
+        self.sock.sendto(byte_data, ("127.0.0.1", self.receiver.port))
+
+    def wait_received(self, received):
+        """received 件受信するまで待つ (不正なパケットは受信数に入らない)"""
+        for _ in range(100):
+            if self.receiver.received >= received:
+                return
+            self.updated.wait(0.02)
+            self.updated.clear()
+            self.receiver.clear_dirty()
+        self.fail(f"received {self.receiver.received} < {received}")
+
+    def test_receives_json_and_binary(self):
+        self.send(get_codec("json").encode(telemetry()))
+        self.send(get_codec("binary").encode(telemetry(team_color="blue", robot_id=2)))
+        self.wait_received(2)
+        self.assertEqual(sorted(self.receiver.robots), [("blue", 2), ("yellow", 1)])
+        sample = self.receiver.robots[("yellow", 1)].latest()
+        self.assertEqual((sample["x"], sample["y"], sample["theta"]), (0.5, -0.5, 0.25))
+
+    def test_missing_theta_is_nan(self):
+        data = telemetry()
+        del data["theta"]
+        self.send(get_codec("json").encode(data))
+        self.wait_received(1)
+        self.assertTrue(math.isnan(self.receiver.robots[("yellow", 1)].latest()["theta"]))
+
+    def test_malformed_packets_do_not_stop_receiver(self):
+        bad = [b'{"type": "telemetry", "team_color": ["x"], "robot_id": 1, "x": 0, "y": 0}',
+               b'{"type": "telemetry", "team_color": "yellow", "robot_id": 1, '
+               b'"x": Infinity, "y": 0}',
+               b'{"type": "telemetry", "team_color": "yellow", "robot_id": 1, '
+               b'"x": 0, "y": 0, "theta": NaN}',
+               get_codec("binary").encode(telemetry(theta=math.inf)),
+               b'{"type": "telemetry", "team_color": "yellow"}',
+               b'[]', b'\x01']
+        for byte_data in bad:
+            self.send(byte_data)
+        self.send(get_codec("json").encode(telemetry(robot_id=5)))
+        self.wait_received(1)
+        self.assertEqual(self.receiver.invalid, len(bad))
+        self.assertEqual(list(self.receiver.robots), [("yellow", 5)])
+        self.assertTrue(self.receiver._thread.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()